@@ -1,92 +1,781 @@
 import pandas as pd
 import logging
-from configparser import ConfigParser
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 
 from utils.redmineconnect import RedmineConnector
-from utils.functions import process_incidents, generate_reports, cleanup_old_reports
-from utils.emailsender import send_reports
+from utils.issuestore import IssueStore
+from utils.functions import (
+    process_incidents,
+    process_incidents_por_bloques,
+    generate_reports,
+    cleanup_old_reports,
+    calcular_huellas_zonas,
+    leer_huellas,
+    guardar_huellas,
+    confirmar_huellas,
+    ARCHIVO_HUELLAS_PENDIENTES,
+)
+from utils.mailqueue import ColaCorreo, drenar_cola
+from utils.snapshot import guardar_snapshot, ultimo_snapshot, cargar_snapshot
+from utils.emailsender import (
+    send_reports,
+    guardar_correos,
+    cargar_mapeo_correos,
+    enviar_lote,
+)
+from utils.checkpoints import (
+    PuntosControl,
+    huella,
+    huella_archivo,
+    ejecucion_pendiente,
+    depurar_ejecuciones,
+)
+from utils import metrics
+from config.settings import leer_config, ajustes
 
 # --- CONFIGURACIÓN INICIAL ---
-config = ConfigParser()
-config.read("config/config.ini")
+# Leída y validada una sola vez por proceso (ver config/settings.py)
+config = leer_config()
+AJUSTES = ajustes()
 
-NOMBRE_CHECKLIST = config.get("Archivos", "checklist")
-RUTA_REPORTES = config.get("Archivos", "ruta_reportes")
+NOMBRE_CHECKLIST = AJUSTES.checklist
+RUTA_REPORTES = AJUSTES.ruta_reportes
+UMBRAL_SIMILITUD = AJUSTES.umbral_similitud
+# Incidencias que se convierten a DataFrame a la vez durante el procesamiento
+TAMANO_BLOQUE = AJUSTES.tamano_bloque
+PROCESAR_DURANTE_EXTRACCION = AJUSTES.procesar_durante_extraccion
+# Bloques descargados que pueden esperar a ser procesados
+BLOQUES_EN_ESPERA = 2
+PROCESOS_REPORTES = AJUSTES.procesos_reportes
+MOTOR_EXCEL = AJUSTES.motor_excel
+ZONAS_SIN_CAMBIOS = AJUSTES.zonas_sin_cambios
+LIBRO_CONSOLIDADO = AJUSTES.libro_consolidado
+INTERVALO_COLA_CORREO = AJUSTES.intervalo_cola_correo
+SINCRONIZACION_INCREMENTAL = AJUSTES.sincronizacion_incremental
+SNAPSHOT_HABILITADO = AJUSTES.snapshot_habilitado
+PUNTOS_CONTROL = AJUSTES.puntos_control
 
 
-def main_job():
+def _abrir_cola_correo():
+    return ColaCorreo(
+        config.get("ColaCorreo", "ruta_bd", fallback="datos/cola_correo.sqlite3"),
+        config.get("ColaCorreo", "carpeta_adjuntos", fallback="datos/cola_correo/"),
+    )
+
+
+def drenar_correos_pendientes():
+    """
+    Tarea periódica: reintenta los correos que quedaron en la cola.
+    """
+    try:
+        drenar_cola(_abrir_cola_correo(), config)
+    except Exception as e:
+        logging.error(f"Error al drenar la cola de correo: {e}", exc_info=True)
+
+
+def _proyectos():
+    """
+    Proyectos a verificar en cada ejecución: uno por sección
+    [Proyecto:<nombre>], o el proyecto único de [Redmine] si no hay ninguna.
+    Cada proyecto es un dict con su nombre (None para el proyecto único),
+    checklist, archivo de mapeo de correos, carpeta de reportes y carpeta
+    de las huellas de sus zonas.
+    """
+    # Las huellas no van junto a los reportes: la limpieza de reportes
+    # antiguos las borraría y todas las zonas volverían a enviarse
+    carpeta_huellas = config.get(
+        "Reportes", "carpeta_huellas", fallback="datos/huellas/"
+    )
+    nombres = [
+        seccion.split(":", 1)[1]
+        for seccion in config.sections()
+        if seccion.startswith("Proyecto:")
+    ]
+    if not nombres:
+        return [
+            {
+                "nombre": None,
+                "checklist": NOMBRE_CHECKLIST,
+                "archivo_mapeo_adm": config.get("Archivos", "archivo_mapeo_adm"),
+                "ruta_reportes": RUTA_REPORTES,
+                "ruta_huellas": carpeta_huellas,
+            }
+        ]
+    return [
+        {
+            "nombre": nombre,
+            "checklist": config.get(
+                f"Proyecto:{nombre}", "checklist", fallback=NOMBRE_CHECKLIST
+            ),
+            "archivo_mapeo_adm": config.get(
+                f"Proyecto:{nombre}",
+                "archivo_mapeo_adm",
+                fallback=config.get("Archivos", "archivo_mapeo_adm"),
+            ),
+            # Cada proyecto escribe sus reportes en una subcarpeta propia
+            "ruta_reportes": config.get(
+                f"Proyecto:{nombre}",
+                "ruta_reportes",
+                fallback=os.path.join(RUTA_REPORTES, nombre),
+            ),
+            "ruta_huellas": os.path.join(carpeta_huellas, nombre),
+        }
+        for nombre in nombres
+    ]
+
+
+def _buscar_proyecto(nombre):
+    for proyecto in _proyectos():
+        if proyecto["nombre"] == nombre:
+            return proyecto
+    raise ValueError(f"No existe la sección [Proyecto:{nombre}] en la configuración.")
+
+
+def _carpeta_reproceso(proyecto):
+    # Nunca la carpeta de reportes: sus huellas y su limpieza son de producción
+    carpeta = config.get("Snapshot", "carpeta_reproceso", fallback="datos/reproceso/")
+    return os.path.join(carpeta, proyecto["nombre"]) if proyecto["nombre"] else carpeta
+
+
+def _carpeta_snapshots(proyecto):
+    carpeta = config.get("Snapshot", "carpeta", fallback="datos/snapshots/")
+    return os.path.join(carpeta, proyecto["nombre"]) if proyecto["nombre"] else carpeta
+
+
+def _guardar_snapshot(df_incidencias, run_id, proyecto):
+    """
+    Guarda la extracción cruda para poder reprocesarla sin consultar Redmine.
+    Un fallo aquí no detiene el proceso.
+    """
+    try:
+        guardar_snapshot(
+            df_incidencias,
+            _carpeta_snapshots(proyecto),
+            run_id,
+            AJUSTES.formato_snapshot,
+            config.getint("Snapshot", "conservar", fallback=10),
+        )
+    except Exception as e:
+        logging.error(f"No se pudo guardar la instantánea de la extracción: {e}")
+
+
+def main_job(forzar_resync=False):
     """
     Función principal que orquesta todo el proceso de RPA.
+    Con 'forzar_resync' se ignora el almacén local y se hace una
+    sincronización completa con Redmine.
+    Al terminar se guarda el registro de métricas de la ejecución.
+    Devuelve el estado final de la ejecución.
     """
-    logging.info("=====================================================")
-    logging.info("INICIANDO PROCESO DE VERIFICACIÓN DE ANEXOS DE REDMINE")
-    logging.info("=====================================================")
+    metricas = metrics.iniciar_ejecucion()
+    try:
+        metricas.estado = _ejecutar_etapas(metricas, forzar_resync)
+    finally:
+        _guardar_metricas(metricas)
+    return metricas.estado
+
 
+def _guardar_metricas(metricas, prometheus=True):
     try:
-        # --- EXTRACCIÓN DE DATOS DE REDMINE (EN PARALELO) ---
-        logging.info(" Extrayendo incidencias de Redmine en paralelo...")
+        metricas.escribir_registro(
+            config.get("Metricas", "ruta_registro", fallback="logs/metricas.jsonl")
+        )
+        ruta_prometheus = config.get("Metricas", "ruta_prometheus", fallback="")
+        if prometheus and ruta_prometheus:
+            metricas.exportar_prometheus(ruta_prometheus)
+    except Exception as e:
+        logging.error(f"No se pudieron guardar las métricas de la ejecución: {e}")
+
+
+def _sufijo(proyecto):
+    """
+    Sufijo de los nombres de etapa (métricas y puntos de control) de un proyecto.
+    """
+    return f"_{proyecto['nombre']}" if proyecto["nombre"] else ""
+
+
+def _procesar(metricas, incidencias, checklist=None, sufijo=""):
+    """
+    Verifica los anexos de las incidencias y devuelve el DataFrame del reporte.
+    'incidencias' es un DataFrame o la lista de incidencias de la extracción,
+    que se procesa por bloques de TAMANO_BLOQUE sin construir el DataFrame completo.
+    """
+    logging.info("Procesando incidencias y verificando anexos...")
+    checklist = checklist or NOMBRE_CHECKLIST
+    with metricas.etapa(f"procesamiento{sufijo}"):
+        if isinstance(incidencias, pd.DataFrame):
+            df_reporte_completo = process_incidents(
+                incidencias, checklist, UMBRAL_SIMILITUD
+            )
+        else:
+            df_reporte_completo = process_incidents_por_bloques(
+                (
+                    incidencias[inicio : inicio + TAMANO_BLOQUE]
+                    for inicio in range(0, len(incidencias), TAMANO_BLOQUE)
+                ),
+                checklist,
+                UMBRAL_SIMILITUD,
+            )
+    logging.info("Procesamiento completado.")
+    return df_reporte_completo
+
+
+def _extraer_y_procesar(metricas, paginas, checklist, sufijo=""):
+    """
+    Extrae las incidencias y verifica sus anexos a la vez: cada bloque de
+    TAMANO_BLOQUE incidencias de 'paginas' (un generador de páginas del
+    conector, completo o incremental) se procesa en un hilo aparte
+    mientras se obtienen las páginas siguientes.
+    Devuelve (incidencias, DataFrame del reporte). Las incidencias son None
+    si la extracción falló; el DataFrame es None si falló el procesamiento,
+    que se repetirá entonces en su propia etapa.
+    """
+    incidencias = []
+    bloques = queue.Queue(maxsize=BLOQUES_EN_ESPERA)
+    resultado = {}
+
+    def procesar():
+        pendientes = iter(bloques.get, None)
         try:
-            redmine_conn = RedmineConnector(config)
-            issues_data = redmine_conn.get_redmine_issues_parallel()
+            resultado["df"] = process_incidents_por_bloques(
+                pendientes, checklist, UMBRAL_SIMILITUD
+            )
         except Exception as e:
             logging.error(
-                "No se pudo establecer la conexión inicial con Redmine. Finalizando proceso."
+                f"Error al procesar las incidencias durante la extracción: {e}",
+                exc_info=True,
             )
-            return
+        finally:
+            # Si el procesamiento terminó antes, se vacía la cola para no
+            # bloquear la extracción
+            for _ in pendientes:
+                pass
+
+    hilo = threading.Thread(target=procesar, name=f"procesamiento{sufijo}")
+    hilo.start()
+    try:
+        bloque = []
+        for pagina in paginas:
+            incidencias.extend(pagina)
+            bloque.extend(pagina)
+            if len(bloque) >= TAMANO_BLOQUE:
+                bloques.put(bloque)
+                bloque = []
+        if bloque:
+            bloques.put(bloque)
+    except Exception as e:
+        logging.error(f"Error al extraer incidencias de Redmine: {e}", exc_info=True)
+        incidencias = None
+    finally:
+        bloques.put(None)
+
+    # Solo se mide lo que el procesamiento añade tras la última página
+    with metricas.etapa(f"procesamiento{sufijo}"):
+        hilo.join()
+    if incidencias is None:
+        return None, None
+    return incidencias, resultado.get("df")
+
+
+def _generar_reportes(
+    metricas, df_reporte_completo, ruta_reportes, ruta_huellas=None, sufijo=""
+):
+    """
+    Genera los reportes por zona (y el libro consolidado si está activado).
+    Con 'ruta_huellas' no se regeneran las zonas cuyo contenido coincide con
+    el del último reporte enviado (según ZONAS_SIN_CAMBIOS).
+    Devuelve ({zona: ruta del reporte}, zonas sin cambios).
+    """
+    huellas = {}
+    zonas_sin_cambios = []
+    if ruta_huellas and ZONAS_SIN_CAMBIOS != "enviar":
+        with metricas.etapa(f"huellas{sufijo}"):
+            huellas = calcular_huellas_zonas(df_reporte_completo)
+            previas = leer_huellas(ruta_huellas)
+            zonas_sin_cambios = [
+                zona for zona, huella in huellas.items() if previas.get(zona) == huella
+            ]
+        metricas.incrementar("zonas_sin_cambios", len(zonas_sin_cambios))
+
+    logging.info("Generando reportes por zona...")
+    with metricas.etapa(f"reportes{sufijo}"):
+        reportes_generados = generate_reports(
+            df_reporte_completo,
+            ruta_reportes,
+            PROCESOS_REPORTES,
+            MOTOR_EXCEL,
+            omitir_zonas=zonas_sin_cambios,
+            consolidado=LIBRO_CONSOLIDADO,
+        )
+
+    if huellas:
+        # Solo las zonas escritas, y como pendientes: cuentan para decidir si
+        # una zona cambió cuando conste su envío (ver _confirmar_huellas).
+        # Si el correo no llega a salir, la zona se regenerará.
+        guardar_huellas(
+            ruta_huellas,
+            {zona: huellas[zona] for zona in reportes_generados},
+            ARCHIVO_HUELLAS_PENDIENTES,
+        )
+
+    logging.info(
+        f"Se generaron {len(reportes_generados)} reportes "
+        f"({len(zonas_sin_cambios)} zonas sin cambios)."
+    )
+    return reportes_generados, zonas_sin_cambios
+
+
+def _confirmar_huellas(cola, listos):
+    """
+    Confirma las huellas de las zonas cuyo reporte ya se envió, en esta
+    ejecución o en un drenado anterior de la cola. Las de los reportes que
+    siguen en la cola (o caducaron sin enviarse) quedan pendientes.
+    """
+    if ZONAS_SIN_CAMBIOS == "enviar":
+        return
+    for proyecto, (_, reportes_generados, _, _) in listos:
+        confirmar_huellas(
+            proyecto["ruta_huellas"],
+            cola.enviadas(reportes_generados, proyecto["nombre"]),
+        )
+
+
+def replay_job(
+    ruta_snapshot=None, enviar=False, dry_run=False, ruta_reportes=None, proyecto=None
+):
+    """
+    Reprocesa una extracción guardada (instantánea) sin consultar Redmine:
+    verificación de anexos, reportes y, opcionalmente, envío de correos.
+    Si no se indica 'ruta_snapshot' se usa la instantánea más reciente (del
+    'proyecto' indicado, con varios proyectos configurados).
+    Los reportes se escriben en 'ruta_reportes' o, por defecto, en la
+    carpeta de reproceso ([Snapshot] carpeta_reproceso), no en la de
+    producción. Con 'dry_run' los correos se guardan como .eml junto a los
+    reportes.
+    Devuelve el estado final, como main_job. Las métricas se añaden al
+    registro con tipo "reproceso", pero no a la exportación de Prometheus,
+    que describe la última ejecución programada.
+    """
+    metricas = metrics.iniciar_ejecucion("reproceso")
+    try:
+        metricas.estado = _reprocesar(
+            metricas, ruta_snapshot, enviar, dry_run, ruta_reportes, proyecto
+        )
+    finally:
+        _guardar_metricas(metricas, prometheus=False)
+    return metricas.estado
+
+
+def _reprocesar(metricas, ruta_snapshot, enviar, dry_run, ruta_reportes, proyecto):
+    try:
+        datos_proyecto = _buscar_proyecto(proyecto) if proyecto else _proyectos()[0]
+        ruta_reportes = ruta_reportes or _carpeta_reproceso(datos_proyecto)
+        if ruta_snapshot is None:
+            ruta_snapshot = ultimo_snapshot(_carpeta_snapshots(datos_proyecto))
+            if ruta_snapshot is None:
+                logging.error(
+                    "No hay instantáneas guardadas. Active [Snapshot] habilitado para generarlas."
+                )
+                return "sin_datos"
+
+        logging.info(f"Reprocesando la extracción guardada en '{ruta_snapshot}'...")
+        with metricas.etapa("carga_snapshot"):
+            df_incidencias = cargar_snapshot(ruta_snapshot)
+
+        df_reporte_completo = _procesar(
+            metricas, df_incidencias, datos_proyecto["checklist"]
+        )
+        if df_reporte_completo.empty:
+            logging.warning(
+                "El DataFrame procesado está vacío. No se generarán reportes."
+            )
+            return "sin_datos"
+
+        reportes_generados, _ = _generar_reportes(
+            metricas, df_reporte_completo, ruta_reportes
+        )
+        if not reportes_generados:
+            logging.warning("No se generaron reportes.")
+            return "sin_reportes"
+
+        email_map = cargar_mapeo_correos(config, datos_proyecto["nombre"])
+        if dry_run:
+            carpeta_correos = os.path.join(ruta_reportes, "correos")
+            with metricas.etapa("envio"):
+                guardar_correos(reportes_generados, config, carpeta_correos, email_map)
+            logging.info(f"Simulación: correos guardados en '{carpeta_correos}'.")
+        elif enviar:
+            # Envío directo, sin la cola: un reporte corregido se envía aunque
+            # la versión anterior del mismo día ya se hubiera enviado.
+            with metricas.etapa("envio"):
+                resultados_envio = send_reports(reportes_generados, config, email_map)
+            if not all(r["enviado"] for r in resultados_envio.values()):
+                return "error_envio"
+        return "exito"
+
+    except Exception as e:
+        logging.error(f"Error al reprocesar la extracción guardada: {e}", exc_info=True)
+        return "error"
+
+
+def _abrir_puntos_control(metricas, forzar_resync):
+    """
+    Devuelve los puntos de control de la ejecución: los de la última
+    ejecución sin terminar (que se reanuda con su mismo run_id) o unos
+    nuevos. None si los puntos de control están desactivados.
+    """
+    if not PUNTOS_CONTROL:
+        return None
+    carpeta = config.get("Ejecuciones", "carpeta", fallback="datos/ejecuciones/")
+    pendiente = None
+    if not forzar_resync:
+        pendiente = ejecucion_pendiente(
+            carpeta,
+            timedelta(
+                hours=config.getfloat("Ejecuciones", "reanudar_horas", fallback=12)
+            ),
+        )
+    if pendiente:
+        logging.info(f"Reanudando la ejecución {pendiente}, que quedó sin terminar.")
+        metricas.run_id = pendiente
+    return PuntosControl(carpeta, metricas.run_id)
+
+
+def _cargar_etapa(puntos, etapa, huella_etapa):
+    if puntos is None:
+        return False, None
+    return puntos.cargar(etapa, huella_etapa)
+
+
+def _guardar_etapa(puntos, etapa, huella_etapa, salida):
+    if puntos is not None:
+        puntos.guardar(etapa, huella_etapa, salida)
+
+
+def _finalizar(puntos, estado):
+    """
+    Marca la ejecución como terminada (ya no se reanudará) y borra las
+    carpetas de ejecuciones antiguas.
+    """
+    if puntos is None:
+        return estado
+    puntos.finalizar(estado)
+    depurar_ejecuciones(
+        config.get("Ejecuciones", "carpeta", fallback="datos/ejecuciones/"),
+        config.getint("Ejecuciones", "conservar", fallback=10),
+    )
+    return estado
+
+
+class _ConexionCompartida:
+    """
+    Conexión a Redmine compartida por las extracciones de todos los
+    proyectos: se autentica una sola vez, y solo si alguna etapa de
+    extracción lo necesita (al reanudar puede no hacer falta). El conector
+    del primer proyecto que se conecta abre la sesión y los demás la
+    comparten, con el mismo límite de peticiones simultáneas.
+    """
+
+    def __init__(self):
+        self._base = None
+        self._lock = threading.Lock()
+
+    def conector(self, proyecto):
+        with self._lock:
+            if self._base is None:
+                # Con secciones [Proyecto:*], [Redmine] puede no tener
+                # project_id ni mapeo propios
+                self._base = RedmineConnector(config, proyecto["nombre"])
+                return self._base
+        return RedmineConnector(config, proyecto["nombre"], compartir_con=self._base)
+
+
+def _etapas_proyecto(metricas, puntos, proyecto, conexion, forzar_resync):
+    """
+    Extracción, procesamiento y reportes de un proyecto.
+    Devuelve (estado de fin anticipado o None, {zona: ruta del reporte},
+    zonas sin cambios, huella de la etapa de reportes).
+    """
+    nombre = proyecto["nombre"]
+    sufijo = _sufijo(proyecto)
+    if nombre:
+        logging.info(f"--- Proyecto '{nombre}' ---")
+
+    # --- EXTRACCIÓN DE DATOS DE REDMINE (EN PARALELO) ---
+    seccion = f"Proyecto:{nombre}" if nombre else "Redmine"
+    seccion_mapeo = config.get(seccion, "mapeo", fallback="MapeoCamposRedmine")
+    huella_extraccion = huella(
+        "extraccion",
+        date.today(),
+        config.get("Redmine", "url", fallback=""),
+        config.get(seccion, "project_id", fallback=""),
+        config.get("Redmine", "dia_corte_mes_anterior", fallback=""),
+        SINCRONIZACION_INCREMENTAL,
+        dict(config[seccion_mapeo]) if seccion_mapeo in config else {},
+    )
+    hecha, issues_data = _cargar_etapa(puntos, f"extraccion{sufijo}", huella_extraccion)
+    df_reporte_completo = None
+    if not hecha:
+        logging.info(" Extrayendo incidencias de Redmine en paralelo...")
+        with metricas.etapa(f"extraccion{sufijo}"):
+            try:
+                redmine_conn = conexion.conector(proyecto)
+                if SINCRONIZACION_INCREMENTAL:
+                    store = IssueStore(config.get("Sincronizacion", "ruta_almacen"))
+                    forzar_resync = forzar_resync or config.getboolean(
+                        "Sincronizacion", "forzar_resync_completo", fallback=False
+                    )
+                if PROCESAR_DURANTE_EXTRACCION:
+                    # Cada página se procesa en cuanto se conoce: al
+                    # descargarla o, en una sincronización incremental, al
+                    # leerla del almacén ya actualizado.
+                    if SINCRONIZACION_INCREMENTAL:
+                        paginas = redmine_conn.iterar_redmine_issues_incremental(
+                            store, forzar_resync
+                        )
+                    else:
+                        paginas = redmine_conn.iterar_redmine_issues()
+                    issues_data, df_reporte_completo = _extraer_y_procesar(
+                        metricas, paginas, proyecto["checklist"], sufijo
+                    )
+                elif SINCRONIZACION_INCREMENTAL:
+                    issues_data = redmine_conn.get_redmine_issues_incremental(
+                        store, forzar_completo=forzar_resync
+                    )
+                else:
+                    issues_data = redmine_conn.get_redmine_issues_parallel()
+            except Exception as e:
+                logging.error(
+                    "No se pudo establecer la conexión inicial con Redmine. Finalizando proceso."
+                )
+                return "error_conexion", {}, [], None
 
         if issues_data is None:
             logging.error(
                 "La extracción de datos de Redmine falló. Revise los logs. Finalizando proceso."
             )
-            return
+            return "error_extraccion", {}, [], None
 
-        if not issues_data:
-            logging.warning(
-                "No se encontraron incidencias para el mes en curso. Finalizando proceso."
+        metricas.incrementar("incidencias_extraidas", len(issues_data))
+        _guardar_etapa(puntos, f"extraccion{sufijo}", huella_extraccion, issues_data)
+
+        if issues_data and SNAPSHOT_HABILITADO:
+            with metricas.etapa(f"snapshot{sufijo}"):
+                _guardar_snapshot(pd.DataFrame(issues_data), metricas.run_id, proyecto)
+
+    if not issues_data:
+        logging.warning(
+            "No se encontraron incidencias para el mes en curso. Finalizando proceso."
+        )
+        return "sin_datos", {}, [], None
+
+    # --- PROCESAMIENTO DE DATOS ---
+    huella_procesamiento = huella(
+        huella_extraccion, huella_archivo(proyecto["checklist"]), UMBRAL_SIMILITUD
+    )
+    if df_reporte_completo is not None:
+        # Ya se procesó durante la extracción; solo falta su punto de control
+        hecha = False
+    else:
+        hecha, df_reporte_completo = _cargar_etapa(
+            puntos, f"procesamiento{sufijo}", huella_procesamiento
+        )
+    if not hecha:
+        if df_reporte_completo is None:
+            df_reporte_completo = _procesar(
+                metricas, issues_data, proyecto["checklist"], sufijo
             )
-            return
+        _guardar_etapa(
+            puntos, f"procesamiento{sufijo}", huella_procesamiento, df_reporte_completo
+        )
+
+    if df_reporte_completo.empty:
+        logging.warning("El DataFrame procesado está vacío. No se generarán reportes.")
+        return "sin_datos", {}, [], None
 
-        df_incidencias = pd.DataFrame(issues_data)
-        logging.info(
-            f"Se construyó el DataFrame con {len(df_incidencias)} incidencias."
+    # --- GENERACIÓN DE REPORTES POR ZONA ---
+    huella_reportes = huella(
+        huella_procesamiento,
+        proyecto["ruta_reportes"],
+        MOTOR_EXCEL,
+        ZONAS_SIN_CAMBIOS,
+        LIBRO_CONSOLIDADO,
+    )
+    hecha, salida = _cargar_etapa(puntos, f"reportes{sufijo}", huella_reportes)
+    if hecha and not all(os.path.exists(ruta) for ruta in salida[0].values()):
+        logging.warning(
+            "Faltan reportes de un intento anterior. Se volverán a generar."
+        )
+        hecha = False
+    if hecha:
+        reportes_generados, zonas_sin_cambios = salida
+    else:
+        reportes_generados, zonas_sin_cambios = _generar_reportes(
+            metricas,
+            df_reporte_completo,
+            proyecto["ruta_reportes"],
+            ruta_huellas=proyecto["ruta_huellas"],
+            sufijo=sufijo,
+        )
+        _guardar_etapa(
+            puntos,
+            f"reportes{sufijo}",
+            huella_reportes,
+            (reportes_generados, zonas_sin_cambios),
         )
-        # Solo para pruebas, comentar en producción
-        df_incidencias.to_excel("incidencias_redmine.xlsx", index=False)
 
-        # --- PROCESAMIENTO DE DATOS ---
+    if not reportes_generados and not zonas_sin_cambios:
+        logging.warning("No se generaron reportes.")
+        return "sin_reportes", {}, [], None
 
-        logging.info("Procesando incidencias y verificando anexos...")
-        df_reporte_completo = process_incidents(df_incidencias, NOMBRE_CHECKLIST)
+    return None, reportes_generados, zonas_sin_cambios, huella_reportes
 
-        if df_reporte_completo.empty:
-            logging.warning(
-                "El DataFrame procesado está vacío. No se generarán reportes."
-            )
-            return
 
-        logging.info("Procesamiento completado.")
+def _ejecutar_proyecto(metricas, puntos, proyecto, conexion, forzar_resync):
+    try:
+        return _etapas_proyecto(metricas, puntos, proyecto, conexion, forzar_resync)
+    except Exception as e:
+        logging.error(
+            f"Error inesperado en el proyecto '{proyecto['nombre']}': {e}",
+            exc_info=True,
+        )
+        return "error", {}, [], None
 
-        # --- GENERACIÓN DE REPORTES POR ZONA ---
-        logging.info("Generando reportes por zona...")
-        reportes_generados = generate_reports(df_reporte_completo, RUTA_REPORTES)
 
-        if not reportes_generados:
-            logging.warning("No se generaron reportes.")
-            return
+def _enviar_avisos(proyectos, resultados):
+    """
+    Envía el aviso de "sin cambios" a las zonas sin cambios de todos los
+    proyectos, en un único lote SMTP. Los avisos no pasan por la cola: si
+    fallan no se reintentan.
+    """
+    envios = {}
+    for proyecto, (_, _, zonas_sin_cambios, _) in zip(proyectos, resultados):
+        if not zonas_sin_cambios:
+            continue
+        email_map = cargar_mapeo_correos(config, proyecto["nombre"]) or {}
+        for zona in zonas_sin_cambios:
+            if zona in email_map:
+                etiqueta = (
+                    f"{zona} ({proyecto['nombre']})" if proyecto["nombre"] else zona
+                )
+                envios[(proyecto["nombre"], zona)] = (etiqueta, email_map[zona], None)
+    enviar_lote(envios, config)
+
+
+def _ejecutar_etapas(metricas, forzar_resync):
+    """
+    Ejecuta las etapas del proceso (extracción, procesamiento, reportes,
+    envío y limpieza) y devuelve el estado final de la ejecución.
 
-        logging.info(f"Se generaron {len(reportes_generados)} reportes.")
+    Con varios proyectos configurados, la extracción, el procesamiento y los
+    reportes de cada uno se ejecutan en paralelo sobre una misma sesión de
+    Redmine, y los correos de todos se envían juntos sobre un único pool SMTP.
+
+    Con puntos de control, cada etapa guarda su resultado junto a una huella
+    de sus entradas (la huella de la etapa anterior y la configuración que le
+    afecta). Si la ejecución se interrumpe, el siguiente intento reutiliza las
+    etapas completadas cuya huella no cambió: p. ej., un checklist nuevo
+    repite el procesamiento y lo posterior, pero no la extracción.
+    """
+    logging.info("=====================================================")
+    logging.info("INICIANDO PROCESO DE VERIFICACIÓN DE ANEXOS DE REDMINE")
+    logging.info("=====================================================")
+
+    try:
+        puntos = _abrir_puntos_control(metricas, forzar_resync)
+        proyectos = _proyectos()
+        conexion = _ConexionCompartida()
+
+        if len(proyectos) == 1:
+            resultados = [
+                _ejecutar_proyecto(
+                    metricas, puntos, proyectos[0], conexion, forzar_resync
+                )
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=len(proyectos)) as executor:
+                resultados = list(
+                    executor.map(
+                        lambda proyecto: _ejecutar_proyecto(
+                            metricas, puntos, proyecto, conexion, forzar_resync
+                        ),
+                        proyectos,
+                    )
+                )
+
+        estados = [estado for estado, _, _, _ in resultados]
+        errores = [
+            estado for estado in estados if estado and estado.startswith("error")
+        ]
+        listos = [
+            (proyecto, resultado)
+            for proyecto, resultado in zip(proyectos, resultados)
+            if resultado[0] is None
+        ]
+        if not listos:
+            if errores:
+                return errores[0]
+            return _finalizar(puntos, estados[0])
 
         # --- ENVÍO DE CORREOS ---
-        logging.info("Enviando reportes por correo electrónico...")
-        send_reports(reportes_generados, config)
+        # Los reportes pasan primero por la cola persistente: si el servidor
+        # SMTP falla, el drenado periódico los reenviará sin regenerarlos.
+        huella_envio = huella(
+            *[
+                (
+                    resultado[3],
+                    huella_archivo(proyecto["archivo_mapeo_adm"]),
+                )
+                for proyecto, resultado in listos
+            ],
+            config.get("Email", "sender_email", fallback=""),
+            config.get("Email", "subject_prefix", fallback=""),
+        )
+        hecha, resultados_envio = _cargar_etapa(puntos, "envio", huella_envio)
+        if not hecha:
+            logging.info("Enviando reportes por correo electrónico...")
+            with metricas.etapa("envio"):
+                cola = _abrir_cola_correo()
+                for proyecto, (_, reportes_generados, _, _) in listos:
+                    cola.encolar(reportes_generados, proyecto["nombre"])
+                resultados_envio = drenar_cola(cola, config)
+                if ZONAS_SIN_CAMBIOS == "aviso":
+                    _enviar_avisos(
+                        [proyecto for proyecto, _ in listos],
+                        [resultado for _, resultado in listos],
+                    )
+            _guardar_etapa(puntos, "envio", huella_envio, resultados_envio)
+        _confirmar_huellas(_abrir_cola_correo(), listos)
+        fallidos = [clave for clave, r in resultados_envio.items() if not r["enviado"]]
+        if fallidos:
+            logging.warning(
+                f"No se pudieron enviar los reportes de: {', '.join(map(str, fallidos))}."
+            )
 
         # --- LIMPIEZA DE REPORTES ANTIGUOS ---
         logging.info("Limpiando reportes con más de 7 días de antigüedad...")
-        cleanup_old_reports(folder_path=RUTA_REPORTES, days_to_keep=5)
+        with metricas.etapa("limpieza"):
+            for proyecto in proyectos:
+                cleanup_old_reports(
+                    folder_path=proyecto["ruta_reportes"], days_to_keep=5
+                )
+
+        if errores:
+            # La ejecución queda abierta para que el reintento complete los
+            # proyectos que fallaron sin repetir los demás.
+            logging.info("===================================================")
+            logging.info("PROCESO FINALIZADO CON ERRORES EN ALGUNOS PROYECTOS")
+            logging.info("===================================================")
+            return errores[0]
 
         logging.info("===================================================")
         logging.info("PROCESO FINALIZADO CON ÉXITO")
         logging.info("===================================================")
+        return _finalizar(puntos, "exito")
 
     except Exception as e:
         logging.error(
@@ -95,3 +784,4 @@ def main_job():
         logging.info("===================================================")
         logging.info("PROCESO FINALIZADO CON ERRORES")
         logging.info("===================================================")
+        return "error"
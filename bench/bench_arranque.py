@@ -0,0 +1,131 @@
+"""
+Tiempo de arranque del servicio.
+
+- Importación: 'python -X importtime -c "import <módulo>"' para run.py (lo
+  que se carga al arrancar) y app.main (lo que se carga en la primera tarea),
+  con los módulos más costosos de cada uno.
+- Primer tick: desde que se lanza 'run.py --no-initial-run' hasta que el
+  planificador queda esperando la hora programada. Se ejecuta en una
+  carpeta temporal con una copia de config/, para no tocar datos/ ni logs/.
+
+Uso (desde la raíz del proyecto):
+    python bench/bench_arranque.py --repeticiones 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from configparser import ConfigParser
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = ["run", "app.main"]
+MENSAJE_LISTO = "Servicio de RPA iniciado"
+
+
+def medir_importacion(modulo):
+    """
+    Devuelve (ms totales, [(ms, módulo)] de las importaciones de primer nivel).
+    """
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    total = 0.0
+    directos = []
+    hijos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        if not acumulado.strip().isdigit():
+            continue
+        ms = int(acumulado) / 1000
+        # La sangría del nombre indica el nivel de anidamiento (2 espacios)
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        # Cada módulo aparece después de sus importaciones (p. ej. las de site)
+        if nivel == 0:
+            if nombre.strip() == modulo:
+                total, directos = ms, hijos
+            hijos = []
+        elif nivel == 1:
+            hijos.append((ms, nombre.strip()))
+    return total, sorted(directos, reverse=True)
+
+
+def preparar_carpeta():
+    """
+    Carpeta temporal con una copia de config/ cuyo estado y bloqueo del
+    planificador apuntan dentro de ella.
+    """
+    carpeta = tempfile.mkdtemp(prefix="bench_arranque_")
+    shutil.copytree(os.path.join(RAIZ, "config"), os.path.join(carpeta, "config"))
+    ruta_ini = os.path.join(carpeta, "config", "config.ini")
+    config = ConfigParser()
+    config.read(ruta_ini, encoding="utf-8")
+    config.set("Planificacion", "ruta_estado", "datos/planificador.json")
+    config.set("Planificacion", "ruta_bloqueo", "datos/rpa.lock")
+    with open(ruta_ini, "w", encoding="utf-8") as f:
+        config.write(f)
+    return carpeta
+
+
+def medir_primer_tick(carpeta, limite=60):
+    """
+    Segundos hasta que run.py registra que el planificador está esperando.
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "run.py"), "--no-initial-run"],
+        cwd=carpeta,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        for linea in proceso.stderr:
+            if MENSAJE_LISTO in linea:
+                return time.perf_counter() - inicio
+            if time.perf_counter() - inicio > limite:
+                break
+        raise RuntimeError("run.py no llegó a esperar la hora programada.")
+    finally:
+        proceso.kill()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'módulo':>10} {'import ms':>10}  importaciones más costosas")
+    for modulo in MODULOS:
+        mediciones = [medir_importacion(modulo) for _ in range(args.repeticiones)]
+        total = statistics.median(total for total, _ in mediciones)
+        _, directos = mediciones[-1]
+        detalle = ", ".join(f"{nombre} {ms:.0f}" for ms, nombre in directos[: args.top])
+        print(f"{modulo:>10} {total:>10.1f}  {detalle}")
+
+    carpeta = preparar_carpeta()
+    try:
+        ticks = [medir_primer_tick(carpeta) for _ in range(args.repeticiones)]
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    print(
+        f"Primer tick del planificador (--no-initial-run): "
+        f"mediana {statistics.median(ticks) * 1000:.0f} ms, "
+        f"máximo {max(ticks) * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
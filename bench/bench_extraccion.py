@@ -0,0 +1,59 @@
+"""
+Benchmark de la extracción de Redmine contra un servidor local simulado
+con latencia y respuestas 429 inyectadas.
+
+Uso (desde la raíz del proyecto):
+    python bench/bench_extraccion.py --incidencias 3000 --latencia 0.05 --prob-429 0.05
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from configparser import ConfigParser
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_redmine import FakeRedmine, generar_issues
+from utils.redmineconnect import RedmineConnector
+
+
+def configuracion_bench(url, modo):
+    config = ConfigParser()
+    config.read("config/config.ini")
+    config.set("Redmine", "url", url)
+    config.set("Redmine", "api_key", "bench")
+    config.set("Redmine", "modo_extraccion", modo)
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidencias", type=int, default=3000)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--prob-429", type=float, default=0.05)
+    parser.add_argument("--modos", nargs="+", default=["fijo", "adaptativo"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    issues = generar_issues(args.incidencias)
+
+    print(
+        f"{'modo':>12} {'segundos':>9} {'incidencias':>12} {'peticiones':>11} {'429':>5}"
+    )
+    for modo in args.modos:
+        with FakeRedmine(issues, args.latencia, args.prob_429) as servidor:
+            conector = RedmineConnector(configuracion_bench(servidor.url, modo))
+            servidor.peticiones = servidor.respuestas_429 = 0
+            inicio = time.perf_counter()
+            datos = conector.get_redmine_issues_parallel() or []
+            segundos = time.perf_counter() - inicio
+            print(
+                f"{modo:>12} {segundos:>9.2f} {len(datos):>12} "
+                f"{servidor.peticiones:>11} {servidor.respuestas_429:>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
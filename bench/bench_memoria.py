@@ -0,0 +1,122 @@
+"""
+Pico de memoria (RSS) del procesamiento según el tamaño del mes.
+
+Cada medición se hace en un proceso nuevo, porque el pico de RSS de un
+proceso nunca baja. Se compara el camino con DataFrame completo
+(pd.DataFrame(incidencias) + process_incidents) con el procesamiento por
+bloques (process_incidents_por_bloques).
+
+Uso (desde la raíz del proyecto):
+    python bench/bench_memoria.py --filas 50000 200000 800000
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODOS = ["dataframe", "bloques"]
+
+
+def rss_mb():
+    """
+    RSS actual del proceso en MB (Linux).
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def medir(modo, filas, anexos, tamano_bloque):
+    import pandas as pd
+
+    from bench.generador import generar_checklist, generar_incidencias
+    from utils.functions import process_incidents, process_incidents_por_bloques
+
+    logging.disable(logging.INFO)
+    checklist = generar_checklist(anexos)
+    ruta = tempfile.mktemp(suffix=".txt")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("\n".join(checklist))
+
+    # La lista de incidencias es la salida de la extracción: existe en ambos modos
+    incidencias = generar_incidencias(filas, 5, checklist, 4)
+    base = rss_mb()
+    inicio = time.perf_counter()
+    if modo == "dataframe":
+        df_reporte = process_incidents(pd.DataFrame(incidencias), ruta)
+    else:
+        df_reporte = process_incidents_por_bloques(
+            (
+                incidencias[i : i + tamano_bloque]
+                for i in range(0, len(incidencias), tamano_bloque)
+            ),
+            ruta,
+        )
+    segundos = time.perf_counter() - inicio
+    os.remove(ruta)
+    return {
+        "modo": modo,
+        "filas": filas,
+        "segundos": round(segundos, 3),
+        "rss_base_mb": round(base, 1),
+        "rss_pico_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "resultado_mb": round(df_reporte.memory_usage(deep=True).sum() / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, nargs="+", default=[50_000, 200_000])
+    parser.add_argument("--anexos", type=int, default=18)
+    parser.add_argument("--tamano-bloque", type=int, default=5000)
+    parser.add_argument(
+        "--hijo", nargs=2, metavar=("MODO", "FILAS"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.hijo:
+        modo, filas = args.hijo
+        print(json.dumps(medir(modo, int(filas), args.anexos, args.tamano_bloque)))
+        return
+
+    print(
+        f"{'modo':>10} {'filas':>9} {'segundos':>9} {'base MB':>8} "
+        f"{'pico MB':>8} {'extra MB':>9} {'resultado MB':>13}"
+    )
+    for filas in args.filas:
+        for modo in MODOS:
+            salida = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--hijo",
+                    modo,
+                    str(filas),
+                    "--anexos",
+                    str(args.anexos),
+                    "--tamano-bloque",
+                    str(args.tamano_bloque),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            print(
+                f"{r['modo']:>10} {r['filas']:>9} {r['segundos']:>9.2f} "
+                f"{r['rss_base_mb']:>8.0f} {r['rss_pico_mb']:>8.0f} "
+                f"{r['rss_pico_mb'] - r['rss_base_mb']:>9.0f} {r['resultado_mb']:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
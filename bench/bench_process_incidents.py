@@ -0,0 +1,43 @@
+"""
+Benchmark de escalado de process_incidents con incidencias sintéticas.
+
+Uso (desde la raíz del proyecto):
+    python bench/bench_process_incidents.py --tamanos 1000 10000 100000 1000000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.generador import generar_incidencias
+from utils.functions import leer_checklist, process_incidents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--checklist", default="config/ANEXOS_CHECKLIST.txt")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    checklist = leer_checklist(args.checklist)
+
+    print(f"{'filas':>10} {'segundos':>10} {'filas/s':>12}")
+    for n in args.tamanos:
+        df = pd.DataFrame(generar_incidencias(n, checklist=checklist))
+        inicio = time.perf_counter()
+        process_incidents(df, args.checklist)
+        segundos = time.perf_counter() - inicio
+        print(f"{n:>10} {segundos:>10.3f} {n / segundos:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
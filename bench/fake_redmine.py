@@ -0,0 +1,214 @@
+"""
+Servidor HTTP local que imita la API REST de Redmine (/issues.json) con
+incidencias sintéticas, para medir la extracción sin tocar producción.
+Permite inyectar latencia y respuestas 429 y cuenta las peticiones recibidas.
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ZONAS = ["Metro", "Oeste", "Chiriquí", "Azuero", "Central"]
+ANEXOS = ["Anexo A", "Anexo B", "Fotografias Certificadas", "Anexo de Video"]
+MAPEO = {
+    "incidencia": 48,
+    "fecha_incidencia": 21,
+    "zona": 15,
+    "causa": 16,
+    "tipo_causa": 17,
+}
+
+
+def generar_issues(n, max_adjuntos=4, semilla=0):
+    """
+    Genera incidencias en el formato JSON de Redmine, creadas en el mes en curso.
+    """
+    rnd = random.Random(semilla)
+    inicio_mes = datetime.now().replace(day=1, hour=0, minute=0, second=0)
+    minutos_mes = max(1, (datetime.now() - inicio_mes).days) * 1440
+    issues = []
+    for ticket in range(1, n + 1):
+        creado = inicio_mes + timedelta(minutes=rnd.randrange(minutos_mes))
+        adjuntos = [
+            {"id": ticket * 10 + k, "filename": rnd.choice(ANEXOS) + ".pdf"}
+            for k in range(rnd.randint(0, max_adjuntos))
+        ]
+        issues.append(
+            {
+                "id": ticket,
+                "project": {"id": 5, "name": "Incidencias"},
+                "subject": f"Incidencia {ticket}",
+                "status": {"id": 1, "name": "Nueva", "is_closed": False},
+                "created_on": creado.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "updated_on": creado.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "custom_fields": [
+                    {
+                        "id": MAPEO["incidencia"],
+                        "name": "Incidencia",
+                        "value": f"INC{ticket:07d}",
+                    },
+                    {
+                        "id": MAPEO["fecha_incidencia"],
+                        "name": "Fecha",
+                        "value": f"{creado:%Y-%m-%d}",
+                    },
+                    {"id": MAPEO["zona"], "name": "Zona", "value": rnd.choice(ZONAS)},
+                    {"id": MAPEO["causa"], "name": "Causa", "value": "Lluvia"},
+                    {
+                        "id": MAPEO["tipo_causa"],
+                        "name": "Tipo de causa",
+                        "value": "Externa",
+                    },
+                    {"id": 18, "name": "Procede", "value": "PROCEDE"},
+                ],
+                "attachments": adjuntos,
+            }
+        )
+    return issues
+
+
+def _en_rango(valor, filtro):
+    if filtro.startswith("><"):
+        desde, hasta = filtro[2:].split("|")
+        return desde <= valor[: len(desde)] and valor[: len(hasta)] <= hasta
+    if filtro.startswith(">="):
+        return valor >= filtro[2:]
+    return True
+
+
+class FakeRedmine:
+    """
+    Uso:
+        with FakeRedmine(issues, latencia=0.05, prob_429=0.1) as servidor:
+            ... servidor.url ... servidor.peticiones ...
+    """
+
+    def __init__(self, issues, latencia=0.0, prob_429=0.0, semilla=0):
+        self.issues = issues
+        self.latencia = latencia
+        self.prob_429 = prob_429
+        self.peticiones = 0
+        self.respuestas_429 = 0
+        # Peticiones atendiéndose a la vez (y el máximo alcanzado)
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _filtrar(self, params):
+        # Como Redmine: sin status_id solo se devuelven las abiertas
+        estado = params.get("status_id", "open")
+        if estado == "*":
+            resultado = self.issues
+        elif estado in ("open", "closed"):
+            cerradas = estado == "closed"
+            resultado = [i for i in self.issues if i["status"]["is_closed"] == cerradas]
+        else:
+            ids = {int(x) for x in estado.split("|")}
+            resultado = [i for i in self.issues if i["status"]["id"] in ids]
+        for clave, valor in params.items():
+            if clave == "created_on":
+                resultado = [i for i in resultado if _en_rango(i["created_on"], valor)]
+            elif clave == "updated_on":
+                resultado = [i for i in resultado if _en_rango(i["updated_on"], valor)]
+            elif clave == "issue_id":
+                ids = {int(x) for x in valor.split(",")}
+                resultado = [i for i in resultado if i["id"] in ids]
+            elif clave.startswith("cf_"):
+                cf_id = int(clave[3:])
+                negado = valor.startswith("!")
+                valor = valor.lstrip("!")
+                resultado = [
+                    i
+                    for i in resultado
+                    if negado
+                    != any(
+                        cf["id"] == cf_id and cf["value"] == valor
+                        for cf in i["custom_fields"]
+                    )
+                ]
+        return resultado
+
+    def _manejador(self):
+        fake = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.peticiones += 1
+                    fake.simultaneas += 1
+                    fake.max_simultaneas = max(fake.max_simultaneas, fake.simultaneas)
+                    saturado = fake._rnd.random() < fake.prob_429
+                    if saturado:
+                        fake.respuestas_429 += 1
+                try:
+                    estado, cabeceras, cuerpo = self._atender(saturado)
+                finally:
+                    # La petición deja de contar antes de enviar la respuesta:
+                    # el cliente puede lanzar la siguiente en cuanto la recibe
+                    with fake._lock:
+                        fake.simultaneas -= 1
+                self.send_response(estado)
+                for clave, valor in cabeceras.items():
+                    self.send_header(clave, valor)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _atender(self, saturado):
+                """
+                Devuelve (estado HTTP, cabeceras, cuerpo) de la respuesta.
+                """
+                if fake.latencia:
+                    time.sleep(fake.latencia)
+                if saturado:
+                    return 429, {"Retry-After": "1"}, b""
+
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.startswith("/users/current"):
+                    return self._json({"user": {"id": 1, "login": "bench"}})
+                if url.path != "/issues.json":
+                    return 404, {}, b""
+
+                issues = fake._filtrar(params)
+                offset = int(params.get("offset", 0))
+                limit = int(params.get("limit", 25))
+                pagina = issues[offset : offset + limit]
+                if "attachments" not in params.get("include", ""):
+                    pagina = [
+                        {k: v for k, v in i.items() if k != "attachments"}
+                        for i in pagina
+                    ]
+                return self._json(
+                    {
+                        "issues": pagina,
+                        "total_count": len(issues),
+                        "offset": offset,
+                        "limit": limit,
+                    }
+                )
+
+            def _json(self, datos):
+                cuerpo = json.dumps(datos).encode("utf-8")
+                return 200, {"Content-Type": "application/json"}, cuerpo
+
+        return Manejador
@@ -0,0 +1,57 @@
+"""
+Generador de datos sintéticos con la misma forma que la salida de
+RedmineConnector._fetch_page, para medir el pipeline sin acceso a Redmine.
+"""
+
+import random
+from datetime import date, timedelta
+
+ZONAS_BASE = ["Metro", "Oeste", "Chiriquí", "Azuero", "Central"]
+
+
+def generar_checklist(anexos):
+    """
+    Devuelve una lista de 'anexos' nombres de anexo distintos.
+    """
+    return [f"Anexo {numero:03d} de verificación" for numero in range(1, anexos + 1)]
+
+
+def generar_zonas(zonas):
+    return [
+        ZONAS_BASE[i] if i < len(ZONAS_BASE) else f"Zona {i + 1}" for i in range(zonas)
+    ]
+
+
+def generar_incidencias(filas, zonas=5, checklist=None, adjuntos=4, semilla=0):
+    """
+    Genera 'filas' diccionarios de incidencia como los de _fetch_page.
+    Cada incidencia tiene entre 0 y 'adjuntos' ficheros PDF, la mayoría con
+    el nombre de un anexo del checklist y algunos con nombres ajenos.
+    """
+    rnd = random.Random(semilla)
+    checklist = checklist or generar_checklist(18)
+    nombres_zonas = generar_zonas(zonas)
+    inicio = date.today().replace(day=1)
+    incidencias = []
+    for ticket in range(1, filas + 1):
+        fecha = inicio + timedelta(days=rnd.randrange(28))
+        ficheros = [
+            (rnd.choice(checklist) if rnd.random() < 0.9 else f"Documento {ticket}")
+            + ".pdf"
+            for _ in range(rnd.randint(0, adjuntos))
+        ]
+        incidencias.append(
+            {
+                "Ticket": ticket,
+                "Asunto": f"Incidencia sintética {ticket}",
+                "Incidencia": f"INC{ticket:07d}",
+                "Fecha Incidencia": fecha.isoformat(),
+                "Zona": rnd.choice(nombres_zonas),
+                "Causa": rnd.choice(["Lluvia", "Viento", "Vegetación"]),
+                "Tipo de causa": rnd.choice(["Externa", "Interna"]),
+                "Ficheros": ficheros,
+                "Creado": f"{fecha.isoformat()}T12:00:00Z",
+                "Actualizado": f"{fecha.isoformat()}T12:00:00Z",
+            }
+        )
+    return incidencias
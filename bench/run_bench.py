@@ -0,0 +1,178 @@
+"""
+Suite de benchmark del pipeline con datos sintéticos: mide por separado
+process_incidents, generate_reports y send_reports (contra un servidor SMTP
+local) y guarda los resultados en un archivo JSON para comparar versiones.
+
+Uso (desde la raíz del proyecto):
+    python bench/run_bench.py --filas 50000 --zonas 8 --anexos 18 --adjuntos 4
+    python bench/run_bench.py --filas 10000 --perfil cprofile
+"""
+
+import argparse
+import cProfile
+import json
+import logging
+import os
+import platform
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+from configparser import ConfigParser
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bench.generador import generar_checklist, generar_incidencias
+from bench.smtp_sink import SumideroSMTP
+from utils.emailsender import send_reports
+from utils.functions import generate_reports, process_incidents
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_maximo_mb():
+    """
+    Pico de memoria residente del proceso en MB (None si no está disponible).
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devuelve KB y macOS bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def medir(nombre, resultados, perfil, carpeta_perfiles):
+    """
+    Mide la duración de una etapa y, según 'perfil', captura cProfile o el
+    pico de memoria de Python con tracemalloc.
+    """
+    registro = {}
+    perfilador = None
+    if perfil == "cprofile":
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+    elif perfil == "tracemalloc":
+        tracemalloc.start()
+
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro["segundos"] = round(time.perf_counter() - inicio, 4)
+        if perfilador is not None:
+            perfilador.disable()
+            ruta = os.path.join(carpeta_perfiles, f"{nombre}.prof")
+            perfilador.dump_stats(ruta)
+            registro["perfil"] = ruta
+            pstats.Stats(perfilador).sort_stats("cumulative").print_stats(10)
+        elif perfil == "tracemalloc":
+            registro["pico_python_mb"] = round(
+                tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2
+            )
+            tracemalloc.stop()
+        registro["rss_maximo_mb"] = rss_maximo_mb()
+        resultados[nombre] = registro
+        print(f"{nombre:>18}: {registro['segundos']:.3f} s")
+
+
+def configuracion_smtp(puerto, ruta_mapeo):
+    config = ConfigParser()
+    config.read_dict(
+        {
+            "Archivos": {"archivo_mapeo_adm": ruta_mapeo},
+            "Email": {
+                "smtp_server": "127.0.0.1",
+                "smtp_port": str(puerto),
+                "sender_email": "bench@localhost",
+                "sender_password": "",
+                "subject_prefix": "[BENCH]",
+                "usar_tls": "false",
+            },
+        }
+    )
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--zonas", type=int, default=5)
+    parser.add_argument("--anexos", type=int, default=18)
+    parser.add_argument("--adjuntos", type=int, default=4)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--perfil", choices=["cprofile", "tracemalloc"])
+    parser.add_argument("--consolidado", action="store_true")
+    parser.add_argument("--sin-envio", action="store_true")
+    parser.add_argument("--salida", default="bench/resultados/bench.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    carpeta = tempfile.mkdtemp(prefix="rpa_bench_")
+
+    checklist = generar_checklist(args.anexos)
+    ruta_checklist = os.path.join(carpeta, "checklist.txt")
+    with open(ruta_checklist, "w", encoding="utf-8") as f:
+        f.write("\n".join(checklist))
+
+    incidencias = generar_incidencias(args.filas, args.zonas, checklist, args.adjuntos)
+    resultados = {}
+
+    with medir("dataframe", resultados, args.perfil, carpeta):
+        df = pd.DataFrame(incidencias)
+    del incidencias
+
+    with medir("process_incidents", resultados, args.perfil, carpeta) as registro:
+        df_reporte = process_incidents(df, ruta_checklist)
+    registro["filas_por_segundo"] = round(args.filas / registro["segundos"])
+
+    ruta_reportes = os.path.join(carpeta, "reportes")
+    with medir("generate_reports", resultados, args.perfil, carpeta) as registro:
+        reportes = generate_reports(
+            df_reporte, ruta_reportes, args.procesos, consolidado=args.consolidado
+        )
+    registro["reportes"] = len(reportes)
+    registro["bytes"] = sum(
+        os.path.getsize(os.path.join(ruta_reportes, nombre))
+        for nombre in os.listdir(ruta_reportes)
+    )
+
+    if not args.sin_envio:
+        ruta_mapeo = os.path.join(carpeta, "email_map.json")
+        with open(ruta_mapeo, "w", encoding="utf-8") as f:
+            json.dump({zona: ["destino@localhost"] for zona in reportes}, f)
+        with SumideroSMTP() as sumidero:
+            config = configuracion_smtp(sumidero.puerto, ruta_mapeo)
+            with medir("send_reports", resultados, args.perfil, carpeta) as registro:
+                send_reports(reportes, config)
+            registro["mensajes"] = sumidero.mensajes
+            registro["bytes_smtp"] = sumidero.bytes
+            registro["mensajes_por_segundo"] = round(
+                sumidero.mensajes / registro["segundos"], 1
+            )
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "parametros": vars(args),
+        "etapas": resultados,
+    }
+    carpeta_salida = os.path.dirname(args.salida)
+    if carpeta_salida and not os.path.exists(carpeta_salida):
+        os.makedirs(carpeta_salida)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Servidor SMTP local mínimo que acepta y descarta los mensajes, para medir
+y probar send_reports sin un servidor de correo real.
+"""
+
+import socketserver
+import threading
+
+
+class SumideroSMTP:
+    """
+    Uso:
+        with SumideroSMTP() as sumidero:
+            ... sumidero.puerto ... sumidero.mensajes ... sumidero.bytes ...
+
+    Con 'fallos_transitorios' las primeras N transacciones se rechazan con
+    un 451 en MAIL FROM, y las direcciones de 'rechazar' con un 550 en RCPT
+    TO. Se guardan los destinatarios aceptados de cada mensaje.
+    """
+
+    def __init__(self, fallos_transitorios=0, rechazar=()):
+        self.mensajes = 0
+        self.bytes = 0
+        self.fallos_transitorios = fallos_transitorios
+        self.rechazar = set(rechazar)
+        self.destinatarios = []
+        self._lock = threading.Lock()
+        self._servidor = socketserver.ThreadingTCPServer(
+            ("127.0.0.1", 0), self._manejador()
+        )
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _manejador(self):
+        sumidero = self
+
+        class Manejador(socketserver.StreamRequestHandler):
+            def responder(self, texto):
+                self.wfile.write(texto.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                self.responder("220 sumidero SMTP")
+                destinatarios = []
+                for linea in self.rfile:
+                    comando = linea.strip().upper()
+                    if comando.startswith(b"MAIL FROM"):
+                        destinatarios = []
+                        with sumidero._lock:
+                            fallar = sumidero.fallos_transitorios > 0
+                            sumidero.fallos_transitorios -= fallar
+                        if fallar:
+                            self.responder("451 intente mas tarde")
+                        else:
+                            self.responder("250 ok")
+                    elif comando.startswith(b"RCPT TO"):
+                        direccion = linea.strip()[len(b"RCPT TO:") :]
+                        direccion = direccion.decode("ascii").strip("<>")
+                        if direccion in sumidero.rechazar:
+                            self.responder("550 buzon inexistente")
+                        else:
+                            destinatarios.append(direccion)
+                            self.responder("250 ok")
+                    elif comando == b"DATA":
+                        self.responder("354 fin con <CRLF>.<CRLF>")
+                        tamano = 0
+                        for dato in self.rfile:
+                            if dato in (b".\r\n", b".\n"):
+                                break
+                            tamano += len(dato)
+                        with sumidero._lock:
+                            sumidero.mensajes += 1
+                            sumidero.bytes += tamano
+                            sumidero.destinatarios.append(destinatarios)
+                        self.responder("250 aceptado")
+                    elif comando == b"QUIT":
+                        self.responder("221 adios")
+                        return
+                    else:
+                        self.responder("250 ok")
+
+        return Manejador
@@ -1,22 +1,193 @@
+import atexit
+import copy
+import gzip
+import json
 import logging
 import os
+import queue
+import shutil
 from datetime import datetime
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+
+from config.settings import ErrorConfiguracion, leer_config
+from utils import metrics
+
+FORMATO_TEXTO = "%(asctime)s - %(levelname)s - %(message)s"
+NOMBRE_ARCHIVO = "rpa.log"
+
+_listener = None
+
+
+class ContextoEjecucion(logging.Filter):
+    """
+    Añade a cada registro el run_id y la etapa de la ejecución en curso.
+    Va en el QueueHandler, que se ejecuta en el hilo que emite el registro.
+    """
+
+    def filter(self, record):
+        actual = metrics.actual()
+        record.run_id = actual.run_id
+        record.etapa = actual.etapa_actual()
+        return True
+
+
+class ManejadorCola(QueueHandler):
+    """
+    QueueHandler que conserva la traza de las excepciones en exc_text en
+    lugar de unirla al mensaje, para que el formato JSON la guarde aparte.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class FormatoJSON(logging.Formatter):
+    """
+    Una línea JSON por registro, para buscar y agregar los logs por run_id o etapa.
+    """
+
+    def format(self, record):
+        datos = {
+            "fecha": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "nivel": record.levelname,
+            "mensaje": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "etapa": getattr(record, "etapa", None),
+            "hilo": record.threadName,
+            "modulo": record.module,
+        }
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False)
+
+
+def _comprimir(origen, destino):
+    """
+    Rotador: guarda el archivo rotado comprimido con gzip.
+    """
+    with open(origen, "rb") as entrada, gzip.open(destino, "wb") as salida:
+        shutil.copyfileobj(entrada, salida)
+    os.remove(origen)
+
+
+def _manejador_archivo(ruta, rotacion, max_mb, conservar, comprimir):
+    if rotacion == "tamano":
+        manejador = RotatingFileHandler(
+            ruta,
+            maxBytes=int(max_mb * 2**20),
+            backupCount=conservar,
+            encoding="utf-8",
+        )
+    else:
+        # Un archivo por día: 'rpa.log' es el del día en curso
+        manejador = TimedRotatingFileHandler(
+            ruta, when="midnight", backupCount=conservar, encoding="utf-8"
+        )
+    if comprimir:
+        manejador.namer = lambda nombre: nombre + ".gz"
+        manejador.rotator = _comprimir
+    return manejador
+
+
+def _opciones():
+    try:
+        config = leer_config()
+    except ErrorConfiguracion:
+        # Sin config.ini se registra con los valores por defecto; el error
+        # se informará al validar la configuración.
+        config = None
+
+    def leer(metodo, clave, fallback):
+        if config is None:
+            return fallback
+        try:
+            return getattr(config, metodo)("Logs", clave, fallback=fallback)
+        except ValueError:
+            return fallback
+
+    return {
+        "carpeta": leer("get", "carpeta", "logs"),
+        "rotacion": leer("get", "rotacion", "diaria"),
+        "max_mb": leer("getfloat", "max_mb", 50),
+        "conservar": leer("getint", "conservar", 30),
+        "comprimir": leer("getboolean", "comprimir", True),
+        "formato": leer("get", "formato", "texto"),
+        "nivel": leer("get", "nivel", "INFO").upper(),
+    }
 
 
 def setup_logging():
     """
     Configura el sistema de logging para la aplicación.
-    Crea un archivo de log diario en la carpeta 'logs'.
+
+    Los registros pasan por una cola (QueueHandler) y un hilo aparte
+    (QueueListener) los escribe en consola y en 'logs/rpa.log', de modo que
+    los hilos de trabajo nunca esperan a la escritura en disco. El archivo
+    rota cada medianoche o al superar un tamaño, y los rotados se
+    comprimen y se conservan según la sección [Logs] de config.ini.
+    """
+    global _listener
+    opciones = _opciones()
+    if not os.path.exists(opciones["carpeta"]):
+        os.makedirs(opciones["carpeta"])
+
+    if opciones["formato"] == "json":
+        formato = FormatoJSON()
+    else:
+        formato = logging.Formatter(FORMATO_TEXTO)
+    manejadores = [
+        _manejador_archivo(
+            os.path.join(opciones["carpeta"], NOMBRE_ARCHIVO),
+            opciones["rotacion"],
+            opciones["max_mb"],
+            opciones["conservar"],
+            opciones["comprimir"],
+        ),
+        logging.StreamHandler(),
+    ]
+    for manejador in manejadores:
+        manejador.setFormatter(formato)
+
+    detener_logging()
+    cola = queue.SimpleQueue()
+    manejador_cola = ManejadorCola(cola)
+    manejador_cola.addFilter(ContextoEjecucion())
+
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    raiz.addHandler(manejador_cola)
+    raiz.setLevel(getattr(logging, opciones["nivel"], logging.INFO))
+
+    _listener = QueueListener(cola, *manejadores, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def detener_logging():
+    """
+    Escribe los registros pendientes de la cola y detiene el hilo de escritura.
     """
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for manejador in _listener.handlers:
+            manejador.close()
+        _listener = None
 
-    log_filename = datetime.now().strftime("%Y-%m-%d") + ".log"
-    log_filepath = os.path.join(log_dir, log_filename)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[logging.FileHandler(log_filepath), logging.StreamHandler()],
-    )
+atexit.register(detener_logging)
@@ -0,0 +1,176 @@
+import functools
+import os
+from configparser import ConfigParser, Error as ErrorLectura
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.scheduler import ExpresionCron
+
+# Solo dependencias ligeras: este módulo se importa al arrancar el servicio,
+# antes de cargar pandas, redminelib u openpyxl.
+
+RUTA_CONFIG = "config/config.ini"
+
+MODOS_EXTRACCION = ("fijo", "adaptativo")
+MOTORES_EXCEL = ("openpyxl", "xlsxwriter")
+OPCIONES_SIN_CAMBIOS = ("enviar", "omitir", "aviso")
+OPCIONES_RECUPERACION = ("una", "ninguna")
+FORMATOS_SNAPSHOT = ("auto", "parquet", "csv")
+
+
+class ErrorConfiguracion(ValueError):
+    """
+    El archivo de configuración no existe o tiene valores no válidos.
+    """
+
+
+@dataclass(frozen=True)
+class Ajustes:
+    """
+    Valores de config.ini que usan el servicio y main_job, ya convertidos a
+    su tipo. Las secciones por proyecto y de mapeo se siguen leyendo del
+    ConfigParser (ver leer_config).
+    """
+
+    checklist: str
+    ruta_reportes: str
+    archivo_mapeo_adm: str
+    modo_extraccion: str
+    umbral_similitud: Optional[float]
+    tamano_bloque: int
+    procesar_durante_extraccion: bool
+    procesos_reportes: Optional[int]
+    motor_excel: str
+    zonas_sin_cambios: str
+    libro_consolidado: bool
+    intervalo_cola_correo: int
+    sincronizacion_incremental: bool
+    snapshot_habilitado: bool
+    formato_snapshot: str
+    puntos_control: bool
+    ejecucion: str
+    ejecutar_al_iniciar: bool
+    recuperacion: str
+    max_retraso_horas: float
+    ruta_estado: str
+    ruta_bloqueo: str
+
+
+@functools.lru_cache(maxsize=None)
+def leer_config(ruta=RUTA_CONFIG):
+    """
+    Lee el archivo de configuración una sola vez por proceso; las llamadas
+    siguientes devuelven el mismo ConfigParser.
+    """
+    if not os.path.exists(ruta):
+        raise ErrorConfiguracion(
+            f"No se encontró el archivo de configuración '{ruta}'."
+        )
+    config = ConfigParser()
+    try:
+        config.read(ruta, encoding="utf-8")
+    except ErrorLectura as e:
+        raise ErrorConfiguracion(f"No se pudo leer '{ruta}': {e}") from e
+    return config
+
+
+@functools.lru_cache(maxsize=None)
+def ajustes(ruta=RUTA_CONFIG):
+    """
+    Convierte y valida la configuración una sola vez por proceso.
+    Si hay valores que faltan o no son válidos lanza ErrorConfiguracion
+    con todos los problemas encontrados, no solo el primero.
+    """
+    config = leer_config(ruta)
+    errores = []
+
+    def leer(metodo, seccion, clave, **kwargs):
+        try:
+            return getattr(config, metodo)(seccion, clave, **kwargs)
+        except (ErrorLectura, ValueError) as e:
+            errores.append(f"[{seccion}] {clave}: {e}")
+            return None
+
+    def opcion(seccion, clave, validas, fallback):
+        valor = leer("get", seccion, clave, fallback=fallback)
+        if valor is not None and valor not in validas:
+            errores.append(
+                f"[{seccion}] {clave}: '{valor}' no es válido ({', '.join(validas)})."
+            )
+        return valor
+
+    umbral = leer("getfloat", "Verificacion", "umbral_similitud", fallback=0.85)
+    aproximada = leer(
+        "getboolean", "Verificacion", "coincidencia_aproximada", fallback=False
+    )
+    resultado = Ajustes(
+        checklist=leer("get", "Archivos", "checklist"),
+        ruta_reportes=leer("get", "Archivos", "ruta_reportes"),
+        archivo_mapeo_adm=leer("get", "Archivos", "archivo_mapeo_adm"),
+        modo_extraccion=opcion("Redmine", "modo_extraccion", MODOS_EXTRACCION, "fijo"),
+        umbral_similitud=umbral if aproximada else None,
+        tamano_bloque=leer("getint", "Verificacion", "tamano_bloque", fallback=5000),
+        procesar_durante_extraccion=leer(
+            "getboolean", "Verificacion", "procesar_durante_extraccion", fallback=True
+        ),
+        procesos_reportes=leer("getint", "Reportes", "procesos", fallback=0) or None,
+        motor_excel=opcion("Reportes", "motor_excel", MOTORES_EXCEL, "openpyxl"),
+        zonas_sin_cambios=opcion(
+            "Reportes", "zonas_sin_cambios", OPCIONES_SIN_CAMBIOS, "enviar"
+        ),
+        libro_consolidado=leer(
+            "getboolean", "Reportes", "libro_consolidado", fallback=False
+        ),
+        intervalo_cola_correo=leer(
+            "getint", "ColaCorreo", "intervalo_minutos", fallback=5
+        ),
+        sincronizacion_incremental=leer(
+            "getboolean", "Sincronizacion", "habilitada", fallback=False
+        ),
+        snapshot_habilitado=leer(
+            "getboolean", "Snapshot", "habilitado", fallback=False
+        ),
+        formato_snapshot=opcion("Snapshot", "formato", FORMATOS_SNAPSHOT, "auto"),
+        puntos_control=leer(
+            "getboolean", "Ejecuciones", "puntos_control", fallback=False
+        ),
+        ejecucion=leer("get", "Planificacion", "ejecucion", fallback="30 16 * * 1,3,5"),
+        ejecutar_al_iniciar=leer(
+            "getboolean", "Planificacion", "ejecutar_al_iniciar", fallback=True
+        ),
+        recuperacion=opcion(
+            "Planificacion", "recuperacion", OPCIONES_RECUPERACION, "una"
+        ),
+        max_retraso_horas=leer(
+            "getfloat", "Planificacion", "max_retraso_horas", fallback=0
+        ),
+        ruta_estado=leer(
+            "get", "Planificacion", "ruta_estado", fallback="datos/planificador.json"
+        ),
+        ruta_bloqueo=leer(
+            "get", "Planificacion", "ruta_bloqueo", fallback="datos/rpa.lock"
+        ),
+    )
+
+    if aproximada and umbral is not None and not 0 < umbral <= 1:
+        errores.append(
+            f"[Verificacion] umbral_similitud: {umbral} debe estar entre 0 y 1."
+        )
+    if resultado.tamano_bloque is not None and resultado.tamano_bloque <= 0:
+        errores.append("[Verificacion] tamano_bloque: debe ser mayor que 0.")
+    if (
+        resultado.intervalo_cola_correo is not None
+        and resultado.intervalo_cola_correo <= 0
+    ):
+        errores.append("[ColaCorreo] intervalo_minutos: debe ser mayor que 0.")
+    if resultado.ejecucion is not None:
+        try:
+            ExpresionCron(resultado.ejecucion)
+        except ValueError as e:
+            errores.append(f"[Planificacion] ejecucion: {e}")
+
+    if errores:
+        raise ErrorConfiguracion(
+            f"Configuración no válida en '{ruta}':\n  " + "\n  ".join(errores)
+        )
+    return resultado
@@ -1,39 +1,115 @@
-import schedule
-import time
+import argparse
 import logging
+from datetime import timedelta
 import sys
 import os
 
 # Directorio raíz al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.main import main_job
+from config.settings import ajustes, ErrorConfiguracion
 from config.logger import setup_logging
+from utils.scheduler import Planificador
+
+# app.main (y con él pandas, redminelib y openpyxl) se importa la primera vez
+# que se ejecuta una tarea, no al arrancar el servicio.
+
+
+def ejecutar_main_job():
+    from app.main import main_job
+
+    return main_job()
+
+
+def ejecutar_drenado_correos():
+    from app.main import drenar_correos_pendientes
+
+    return drenar_correos_pendientes()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="RPA de verificación de anexos de incidencias de Redmine."
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="?",
+        const="",
+        metavar="INSTANTANEA",
+        help="Reprocesa una extracción guardada sin consultar Redmine "
+        "(por defecto, la instantánea más reciente) y termina.",
+    )
+    parser.add_argument(
+        "--enviar",
+        action="store_true",
+        help="Con --replay, envía los reportes generados por correo.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Con --replay, guarda los correos como .eml en lugar de enviarlos.",
+    )
+    parser.add_argument(
+        "--proyecto",
+        help="Con --replay y varios proyectos configurados, proyecto a reprocesar.",
+    )
+    parser.add_argument(
+        "--no-initial-run",
+        action="store_true",
+        help="No ejecuta el proceso al arrancar el servicio; solo se recupera "
+        "una ejecución perdida si lo indica [Planificacion] recuperacion.",
+    )
+    parser.add_argument(
+        "--salida",
+        help="Con --replay, carpeta de los reportes (por defecto, [Snapshot] "
+        "carpeta_reproceso; nunca la de los reportes programados).",
+    )
+    return parser.parse_args()
+
 
 # --- PROGRAMACIÓN DE LA TAREA ---
 if __name__ == "__main__":
+    args = parse_args()
+
     # Configurar logging
     setup_logging()
 
+    try:
+        opciones = ajustes()
+    except ErrorConfiguracion as e:
+        logging.error(str(e))
+        sys.exit(2)
+
+    if args.replay is not None:
+        from app.main import replay_job
+
+        estado = replay_job(
+            args.replay or None, args.enviar, args.dry_run, args.salida, args.proyecto
+        )
+        logging.info(f"Reproceso finalizado con estado '{estado}'.")
+        sys.exit(0 if estado == "exito" else 1)
+
     # Programar el job
-    logging.info("Servicio de RPA iniciado. Esperando la hora programada...")
+    planificador = Planificador(opciones.ruta_estado, opciones.ruta_bloqueo)
+    planificador.agregar_cron(
+        "main_job", opciones.ejecucion, ejecutar_main_job, opciones.recuperacion
+    )
+    # Reintento periódico de los correos que no se pudieron enviar
+    planificador.agregar_intervalo(
+        "cola_correo", opciones.intervalo_cola_correo, ejecutar_drenado_correos
+    )
 
-    main_job()
-
-    schedule.every().monday.at("16:30").do(main_job)
-    schedule.every().wednesday.at("16:30").do(main_job)
-    schedule.every().friday.at("16:30").do(main_job)
-
-    # Bucle de ejecución
-    while True:
-        try:
-            schedule.run_pending()
-            time.sleep(60)  # Espera 60 segundos antes de volver a verificar
-        except KeyboardInterrupt:
-            logging.info("Proceso de RPA detenido manualmente.")
-            break
-        except Exception as e:
-            logging.error(
-                f"Error en el bucle principal del scheduler: {e}", exc_info=True
-            )
-            time.sleep(300)  # Espera 5 minutos antes de reintentar en caso de error
+    logging.info("Servicio de RPA iniciado. Esperando la hora programada...")
+    try:
+        planificador.iniciar(
+            ejecutar_al_iniciar=opciones.ejecutar_al_iniciar
+            and not args.no_initial_run,
+            max_retraso=(
+                timedelta(hours=opciones.max_retraso_horas)
+                if opciones.max_retraso_horas
+                else None
+            ),
+        )
+    except KeyboardInterrupt:
+        logging.info("Proceso de RPA detenido manualmente.")
+        planificador.detener()
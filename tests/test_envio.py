@@ -0,0 +1,112 @@
+"""
+Envío de reportes contra un servidor SMTP local (bench/smtp_sink.py):
+reintentos ante fallos transitorios, resultado de cada zona y destinatarios
+rechazados.
+"""
+
+from configparser import ConfigParser
+
+import pytest
+
+from bench.smtp_sink import SumideroSMTP
+from utils.emailsender import enviar_lote, send_reports
+
+REINTENTOS = 2
+
+
+def configuracion(puerto):
+    config = ConfigParser()
+    config.read_dict(
+        {
+            "Email": {
+                "smtp_server": "127.0.0.1",
+                "smtp_port": str(puerto),
+                "sender_email": "rpa@localhost",
+                "sender_password": "",
+                "subject_prefix": "[TEST]",
+                "usar_tls": "false",
+                "conexiones": "2",
+                "reintentos": str(REINTENTOS),
+                "espera_reintento": "0.01",
+            },
+        }
+    )
+    return config
+
+
+@pytest.fixture
+def reportes(tmp_path):
+    rutas = {}
+    for zona in ["Metro", "Oeste", "Central", "Azuero"]:
+        ruta = tmp_path / f"Reporte_Verificacion_{zona}.xlsx"
+        ruta.write_bytes(b"PK" + zona.encode() * 100)
+        rutas[zona] = str(ruta)
+    return rutas
+
+
+def test_resultado_por_zona(reportes):
+    email_map = {
+        "Metro": ["metro@localhost", "gerencia@localhost"],
+        "Oeste": ["gerencia@localhost", "metro@localhost"],
+        "Central": ["central@localhost"],
+    }
+    with SumideroSMTP() as sumidero:
+        resultados = send_reports(reportes, configuracion(sumidero.puerto), email_map)
+
+    enviado = {"enviado": True, "intentos": 1, "error": None, "rechazados": {}}
+    assert resultados == {
+        "Metro": enviado,
+        "Oeste": enviado,
+        "Central": enviado,
+        "Azuero": {
+            "enviado": False,
+            "intentos": 0,
+            "error": "Sin mapeo de correo",
+            "rechazados": {},
+        },
+    }
+    # Metro y Oeste comparten destinatarios: un solo correo para las dos
+    assert sumidero.mensajes == 2
+    assert sorted(map(sorted, sumidero.destinatarios)) == [
+        ["central@localhost"],
+        ["gerencia@localhost", "metro@localhost"],
+    ]
+
+
+def test_reintenta_fallo_transitorio(reportes):
+    with SumideroSMTP(fallos_transitorios=1) as sumidero:
+        resultados = send_reports(
+            {"Metro": reportes["Metro"]},
+            configuracion(sumidero.puerto),
+            {"Metro": ["metro@localhost"]},
+        )
+    assert resultados["Metro"]["enviado"]
+    assert resultados["Metro"]["intentos"] == 2
+    assert sumidero.mensajes == 1
+
+
+def test_agota_reintentos(reportes):
+    envios = {"clave-metro": ("Metro", ["metro@localhost"], reportes["Metro"])}
+    with SumideroSMTP(fallos_transitorios=REINTENTOS + 1) as sumidero:
+        resultados = enviar_lote(envios, configuracion(sumidero.puerto))
+    resultado = resultados["clave-metro"]
+    assert not resultado["enviado"]
+    assert resultado["intentos"] == REINTENTOS + 1
+    assert "451" in resultado["error"]
+    assert sumidero.mensajes == 0
+
+
+def test_destinatarios_rechazados(reportes):
+    # Dos zonas en el mismo correo: las dos claves reciben los rechazados
+    envios = {
+        clave: (zona, ["metro@localhost", "baja@localhost"], reportes[zona])
+        for clave, zona in [("clave-metro", "Metro"), ("clave-oeste", "Oeste")]
+    }
+    with SumideroSMTP(rechazar={"baja@localhost"}) as sumidero:
+        resultados = enviar_lote(envios, configuracion(sumidero.puerto))
+
+    assert sumidero.destinatarios == [["metro@localhost"]]
+    for resultado in resultados.values():
+        assert resultado["enviado"]
+        assert list(resultado["rechazados"]) == ["baja@localhost"]
+        assert resultado["rechazados"]["baja@localhost"].startswith("550")
@@ -0,0 +1,73 @@
+"""
+Huellas de las zonas con zonas_sin_cambios=omitir: deben sobrevivir a la
+limpieza de reportes antiguos, o todas las zonas volverían a enviarse.
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from app import main
+from utils.functions import cleanup_old_reports, confirmar_huellas
+from utils.metrics import MetricasEjecucion
+
+
+def reporte(zonas):
+    return pd.DataFrame(
+        {
+            "Ticket": range(len(zonas)),
+            "Incidencia": [f"INC{i:07d}" for i in range(len(zonas))],
+            "Fecha Incidencia": "2026-10-01",
+            "Zona": zonas,
+            "Asunto": "Asunto",
+            "Causa": "Lluvia",
+            "Tipo de Causa": "Externa",
+            "Anexo A": True,
+        }
+    )
+
+
+def envejecer(carpeta, dias):
+    antiguedad = time.time() - dias * 24 * 60 * 60
+    for raiz, _, archivos in os.walk(carpeta):
+        for archivo in archivos:
+            os.utime(os.path.join(raiz, archivo), (antiguedad, antiguedad))
+
+
+@pytest.fixture
+def omitir(monkeypatch):
+    monkeypatch.setattr(main, "ZONAS_SIN_CAMBIOS", "omitir")
+    monkeypatch.setattr(main, "PROCESOS_REPORTES", 1)
+    monkeypatch.setattr(main, "LIBRO_CONSOLIDADO", False)
+
+
+def test_huellas_fuera_de_la_carpeta_de_reportes():
+    for proyecto in main._proyectos():
+        reportes = os.path.abspath(proyecto["ruta_reportes"])
+        huellas = os.path.abspath(proyecto["ruta_huellas"])
+        assert os.path.commonpath([reportes, huellas]) != reportes
+
+
+def test_limpieza_no_vuelve_a_enviar_zonas_sin_cambios(tmp_path, omitir):
+    ruta_reportes = str(tmp_path / "reportes")
+    ruta_huellas = str(tmp_path / "datos" / "huellas")
+    df = reporte(["Metro", "Oeste", "Metro"])
+
+    generados, sin_cambios = main._generar_reportes(
+        MetricasEjecucion(), df, ruta_reportes, ruta_huellas
+    )
+    assert set(generados) == {"Metro", "Oeste"} and not sin_cambios
+    confirmar_huellas(ruta_huellas, generados)
+
+    # Varias ejecuciones sin cambios: nada reescribe las huellas
+    envejecer(tmp_path, 6)
+    cleanup_old_reports(ruta_reportes, days_to_keep=5)
+    assert not os.listdir(ruta_reportes)
+
+    generados, sin_cambios = main._generar_reportes(
+        MetricasEjecucion(), df, ruta_reportes, ruta_huellas
+    )
+    assert not generados
+    assert set(sin_cambios) == {"Metro", "Oeste"}
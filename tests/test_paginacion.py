@@ -0,0 +1,110 @@
+"""
+Paginación de la extracción contra un Redmine local simulado
+(bench/fake_redmine.py): cada página se pide una sola vez, sin consulta de
+conteo previa, y las páginas se unen en orden de tramo y offset.
+"""
+
+import math
+from configparser import ConfigParser
+from datetime import datetime
+
+import pytest
+
+from bench.fake_redmine import MAPEO, FakeRedmine, generar_issues
+from utils.redmineconnect import PAGE_SIZE, RedmineConnector, planificar_tramos
+
+INCIDENCIAS = 450
+
+
+def configuracion(url, dias_tramo, cache=False):
+    config = ConfigParser()
+    config.read_dict(
+        {
+            "Redmine": {
+                "url": url,
+                "api_key": "test",
+                "project_id": "5",
+                "modo_extraccion": "fijo",
+                "max_conexiones": "8",
+                "dias_tramo": str(dias_tramo),
+                "max_incidencias_tramo": "100000",
+            },
+            "MapeoCamposRedmine": {campo: str(id_) for campo, id_ in MAPEO.items()},
+            # Sin ruta: la caché de adjuntos vive solo en memoria
+            "CacheAdjuntos": {"habilitada": str(cache).lower(), "ruta": ""},
+        }
+    )
+    return config
+
+
+def tramos_esperados(servidor, conector):
+    """
+    Tickets de cada tramo de la ventana, en el orden en que los devuelve Redmine.
+    """
+    inicio, fin = (
+        datetime.strptime(fecha, "%Y-%m-%d").date()
+        for fecha in conector._rango_fechas()
+    )
+    return [
+        [
+            issue["id"]
+            for issue in servidor._filtrar(
+                {"created_on": tramo.filtro, "cf_18": "PROCEDE"}
+            )
+        ]
+        for tramo in planificar_tramos(inicio, fin, conector.dias_tramo)
+    ]
+
+
+def paginas(tickets):
+    # Un tramo vacío también necesita su primera página para saberlo
+    return max(1, math.ceil(len(tickets) / PAGE_SIZE))
+
+
+@pytest.fixture
+def servidor():
+    # Con latencia, las páginas terminan en otro orden que el de petición
+    with FakeRedmine(generar_issues(INCIDENCIAS), latencia=0.01) as servidor:
+        yield servidor
+
+
+@pytest.mark.parametrize("dias_tramo", [400, 7, 1])
+def test_una_peticion_por_pagina_en_orden(servidor, dias_tramo):
+    conector = RedmineConnector(configuracion(servidor.url, dias_tramo))
+    servidor.peticiones = 0
+
+    issues = conector.get_redmine_issues_parallel()
+
+    esperados = tramos_esperados(servidor, conector)
+    assert [issue["Ticket"] for issue in issues] == [
+        ticket for tickets in esperados for ticket in tickets
+    ]
+    assert len(issues) == INCIDENCIAS
+    assert servidor.peticiones == sum(paginas(tickets) for tickets in esperados)
+    assert conector.total_count == INCIDENCIAS
+    assert conector.paginas_fallidas == []
+
+
+def test_cache_adjuntos_un_lote_por_pagina(servidor):
+    conector = RedmineConnector(configuracion(servidor.url, 7, cache=True))
+    esperados = tramos_esperados(servidor, conector)
+    n_paginas = sum(paginas(tickets) for tickets in esperados)
+    # Solo las páginas con incidencias piden los adjuntos de sus tickets
+    con_datos = sum(
+        math.ceil(len(tickets) / PAGE_SIZE) for tickets in esperados if tickets
+    )
+
+    servidor.peticiones = 0
+    primera = conector.get_redmine_issues_parallel()
+    assert servidor.peticiones == n_paginas + con_datos
+
+    # Con la caché caliente no se vuelve a pedir ningún adjunto
+    servidor.peticiones = 0
+    segunda = conector.get_redmine_issues_parallel()
+    assert servidor.peticiones == n_paginas
+    assert segunda == primera
+    assert all(
+        issue["Ficheros"]
+        == [a["filename"] for a in servidor.issues[issue["Ticket"] - 1]["attachments"]]
+        for issue in primera
+    )
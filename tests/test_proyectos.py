@@ -0,0 +1,131 @@
+"""
+Ejecuciones con varios proyectos: configuración solo con secciones
+[Proyecto:*], sesión y límite de peticiones compartidos contra un Redmine
+local simulado (bench/fake_redmine.py) y almacén local por proyecto y ticket.
+"""
+
+import json
+import sqlite3
+import threading
+from configparser import ConfigParser
+
+import pytest
+
+from app import main
+from bench.fake_redmine import MAPEO, FakeRedmine, generar_issues
+from utils.issuestore import IssueStore
+
+MAX_CONEXIONES = 4
+
+
+def configuracion(url, modo="fijo"):
+    # Sin project_id ni [MapeoCamposRedmine]: cada proyecto trae los suyos
+    config = ConfigParser()
+    config.read_dict(
+        {
+            "Redmine": {
+                "url": url,
+                "api_key": "test",
+                "modo_extraccion": modo,
+                "max_conexiones": str(MAX_CONEXIONES),
+                "concurrencia_inicial": str(MAX_CONEXIONES),
+                "dias_tramo": "1",
+            },
+            "Archivos": {
+                "checklist": "config/ANEXOS_CHECKLIST.txt",
+                "ruta_reportes": "reportes_generados/",
+                "archivo_mapeo_adm": "config/email_map.json",
+            },
+            "Proyecto:Instalaciones": {"project_id": "5", "mapeo": "Mapeo:5"},
+            "Proyecto:Mantenimiento": {"project_id": "7", "mapeo": "Mapeo:7"},
+            "Mapeo:5": {campo: str(id_) for campo, id_ in MAPEO.items()},
+            "Mapeo:7": {campo: str(id_) for campo, id_ in MAPEO.items()},
+        }
+    )
+    return config
+
+
+@pytest.fixture
+def servidor():
+    with FakeRedmine(generar_issues(600), latencia=0.02) as servidor:
+        yield servidor
+
+
+def conectores(monkeypatch, config):
+    monkeypatch.setattr(main, "config", config)
+    conexion = main._ConexionCompartida()
+    return [conexion.conector(proyecto) for proyecto in main._proyectos()]
+
+
+def test_solo_secciones_de_proyecto(servidor, monkeypatch):
+    config = configuracion(servidor.url)
+    monkeypatch.setattr(main, "config", config)
+    assert [p["nombre"] for p in main._proyectos()] == [
+        "Instalaciones",
+        "Mantenimiento",
+    ]
+
+    instalaciones, mantenimiento = conectores(monkeypatch, config)
+    assert (instalaciones.project_id, mantenimiento.project_id) == ("5", "7")
+    # Una sola autenticación: el segundo proyecto reutiliza la sesión
+    assert servidor.peticiones == 1
+    assert mantenimiento.redmine is instalaciones.redmine
+    assert mantenimiento._conexiones is instalaciones._conexiones
+    assert instalaciones.get_redmine_issues_parallel()
+    assert mantenimiento.get_redmine_issues_parallel()
+
+
+@pytest.mark.parametrize("modo", ["fijo", "adaptativo"])
+def test_limite_de_peticiones_entre_proyectos(servidor, monkeypatch, modo):
+    proyectos = conectores(monkeypatch, configuracion(servidor.url, modo))
+    resultados = {}
+
+    def extraer(conector):
+        resultados[conector.project_id] = conector.get_redmine_issues_parallel()
+
+    hilos = [threading.Thread(target=extraer, args=(c,)) for c in proyectos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert all(resultados.values()) and len(resultados) == 2
+    assert 1 < servidor.max_simultaneas <= MAX_CONEXIONES
+
+
+def test_migracion_almacen_clave_solo_ticket(tmp_path):
+    ruta = str(tmp_path / "incidencias.sqlite3")
+    with sqlite3.connect(ruta) as conn:
+        conn.execute("""
+            CREATE TABLE incidencias (
+                ticket INTEGER PRIMARY KEY,
+                proyecto TEXT NOT NULL,
+                creado TEXT,
+                actualizado TEXT,
+                vigente INTEGER NOT NULL DEFAULT 1,
+                datos TEXT NOT NULL
+            )
+            """)
+        conn.execute(
+            "CREATE INDEX ix_incidencias_proyecto "
+            "ON incidencias (proyecto, vigente, creado)"
+        )
+        conn.executemany(
+            "INSERT INTO incidencias VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (1, "5", "2026-10-01", "2026-10-01", 1, json.dumps({"Ticket": 1})),
+                (2, "5", "2026-10-02", "2026-10-02", 0, json.dumps({"Ticket": 2})),
+            ],
+        )
+    conn.close()
+
+    store = IssueStore(ruta)
+    assert store.cargar("5", "2026-10-01", "2026-10-31") == [{"Ticket": 1}]
+
+    # Tras la migración, el mismo ticket puede estar en dos proyectos
+    issue = {"Ticket": 1, "Creado": "2026-10-01", "Actualizado": "2026-10-03"}
+    store.guardar("7", [issue])
+    assert store.cargar("5", "2026-10-01", "2026-10-31") == [{"Ticket": 1}]
+    assert store.cargar("7", "2026-10-01", "2026-10-31") == [issue]
+    # Abrir de nuevo un almacén ya migrado no cambia nada
+    assert IssueStore(ruta).cargar("7", "2026-10-01", "2026-10-31") == [issue]
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheAdjuntos:
+    """
+    Caché LRU de los adjuntos PDF de cada ticket: {ticket: (updated_on, ficheros)}.
+
+    Una entrada solo es válida mientras el ticket conserve la misma fecha de
+    actualización en Redmine (añadir o quitar un adjunto la cambia). Al
+    superar 'max_entradas' se descartan los tickets usados hace más tiempo.
+    Si se indica 'ruta', la caché se carga y se guarda en un archivo JSON
+    para conservarla entre ejecuciones.
+    """
+
+    def __init__(self, max_entradas=50000, ruta=None):
+        self.max_entradas = max_entradas
+        self.ruta = ruta
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        if ruta and os.path.exists(ruta):
+            self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            for ticket, (actualizado, ficheros) in datos.items():
+                self._entradas[int(ticket)] = (actualizado, ficheros)
+            logging.info(
+                f"Caché de adjuntos cargada con {len(self._entradas)} tickets desde '{self.ruta}'."
+            )
+        except (OSError, ValueError) as e:
+            logging.warning(
+                f"No se pudo leer la caché de adjuntos '{self.ruta}': {e}. Se empezará vacía."
+            )
+            self._entradas.clear()
+
+    def obtener(self, ticket, actualizado):
+        """
+        Devuelve la lista de ficheros del ticket, o None si no está en caché
+        o si el ticket se actualizó desde que se guardó.
+        """
+        with self._lock:
+            entrada = self._entradas.get(ticket)
+            if entrada is None or entrada[0] != actualizado:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(ticket)
+            self.aciertos += 1
+            return list(entrada[1])
+
+    def guardar(self, ticket, actualizado, ficheros):
+        with self._lock:
+            self._entradas[ticket] = (actualizado, list(ficheros))
+            self._entradas.move_to_end(ticket)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.aciertos = self.fallos = 0
+
+    def persistir(self):
+        """
+        Guarda la caché en disco (si tiene ruta) de forma atómica.
+        """
+        if not self.ruta:
+            return
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+        temporal = self.ruta + ".tmp"
+        with self._lock:
+            datos = {str(ticket): entrada for ticket, entrada in self._entradas.items()}
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+from datetime import datetime
+
+# Marca de una ejecución que terminó (con éxito o sin nada que hacer)
+MARCA_FINALIZADA = "finalizada.json"
+
+
+def huella(*partes):
+    """
+    Huella (SHA-256) de los valores que determinan la salida de una etapa:
+    la huella de la etapa anterior, opciones de configuración, contenido de
+    archivos... Cualquier cambio invalida la etapa y las posteriores.
+    """
+    texto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def huella_archivo(ruta):
+    """
+    Huella del contenido de un archivo (None si no existe).
+    """
+    if not os.path.exists(ruta):
+        return None
+    contenido = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            contenido.update(bloque)
+    return contenido.hexdigest()
+
+
+class PuntosControl:
+    """
+    Carpeta de una ejecución de main_job con la salida de cada etapa
+    completada ('<etapa>.pkl') y su marca ('<etapa>.json'), que guarda la
+    huella con la que se calculó. Un reintento de la misma ejecución reutiliza
+    las etapas cuya huella no cambió y continúa desde la primera pendiente.
+    """
+
+    def __init__(self, carpeta_base, run_id):
+        self.run_id = run_id
+        self.carpeta = os.path.join(carpeta_base, run_id)
+        if os.path.exists(self._ruta(MARCA_FINALIZADA)):
+            # Una ejecución finalizada no se reanuda: sus etapas no deben
+            # reutilizarse en otra con el mismo run_id
+            logging.warning(
+                f"La carpeta de la ejecución {run_id} pertenece a una ejecución "
+                "ya finalizada. Se descartan sus puntos de control."
+            )
+            shutil.rmtree(self.carpeta)
+        if not os.path.exists(self.carpeta):
+            os.makedirs(self.carpeta)
+
+    def _ruta(self, nombre):
+        return os.path.join(self.carpeta, nombre)
+
+    def cargar(self, etapa, huella_etapa):
+        """
+        Devuelve (True, salida) si la etapa se completó con la misma huella
+        y (False, None) si hay que ejecutarla.
+        """
+        ruta_marca = self._ruta(f"{etapa}.json")
+        if not os.path.exists(ruta_marca):
+            return False, None
+        try:
+            with open(ruta_marca, "r", encoding="utf-8") as f:
+                marca = json.load(f)
+            if marca.get("huella") != huella_etapa:
+                logging.info(
+                    f"La configuración de la etapa '{etapa}' cambió desde el "
+                    "último intento. Se volverá a ejecutar."
+                )
+                return False, None
+            with open(self._ruta(f"{etapa}.pkl"), "rb") as f:
+                salida = pickle.load(f)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+            logging.warning(
+                f"No se pudo leer el punto de control de la etapa '{etapa}': {e}."
+            )
+            return False, None
+        logging.info(
+            f"Etapa '{etapa}' ya completada en la ejecución {self.run_id} "
+            f"({marca['fin']}). Se reutiliza su resultado."
+        )
+        return True, salida
+
+    def guardar(self, etapa, huella_etapa, salida):
+        """
+        Guarda la salida de la etapa y, después, su marca de completada.
+        """
+        ruta_salida = self._ruta(f"{etapa}.pkl")
+        with open(ruta_salida + ".tmp", "wb") as f:
+            pickle.dump(salida, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(ruta_salida + ".tmp", ruta_salida)
+        self._escribir_json(
+            f"{etapa}.json",
+            {
+                "huella": huella_etapa,
+                "fin": datetime.now().isoformat(timespec="seconds"),
+            },
+        )
+
+    def finalizar(self, estado):
+        self._escribir_json(
+            MARCA_FINALIZADA,
+            {"estado": estado, "fin": datetime.now().isoformat(timespec="seconds")},
+        )
+
+    def _escribir_json(self, nombre, datos):
+        ruta = self._ruta(nombre)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(ruta + ".tmp", ruta)
+
+
+def ejecucion_pendiente(carpeta_base, max_antiguedad):
+    """
+    Devuelve el run_id de la ejecución más reciente que no llegó a
+    finalizar, o None si no hay ninguna más nueva que 'max_antiguedad'.
+    """
+    if not os.path.isdir(carpeta_base):
+        return None
+    ejecuciones = sorted(
+        nombre
+        for nombre in os.listdir(carpeta_base)
+        if os.path.isdir(os.path.join(carpeta_base, nombre))
+    )
+    if not ejecuciones:
+        return None
+    ultima = ejecuciones[-1]
+    carpeta = os.path.join(carpeta_base, ultima)
+    if os.path.exists(os.path.join(carpeta, MARCA_FINALIZADA)):
+        return None
+    ultima_actividad = datetime.fromtimestamp(os.path.getmtime(carpeta))
+    if datetime.now() - ultima_actividad > max_antiguedad:
+        logging.warning(
+            f"La ejecución {ultima} quedó sin terminar hace más de "
+            f"{max_antiguedad}. No se reanudará."
+        )
+        return None
+    return ultima
+
+
+def depurar_ejecuciones(carpeta_base, conservar):
+    """
+    Borra las carpetas de ejecución más antiguas dejando las 'conservar' más recientes.
+    """
+    if not os.path.isdir(carpeta_base) or conservar <= 0:
+        return
+    ejecuciones = sorted(
+        nombre
+        for nombre in os.listdir(carpeta_base)
+        if os.path.isdir(os.path.join(carpeta_base, nombre))
+    )
+    for nombre in ejecuciones[:-conservar]:
+        shutil.rmtree(os.path.join(carpeta_base, nombre), ignore_errors=True)
+        logging.info(f"Carpeta de ejecución antigua eliminada: {nombre}")
@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class ControladorAIMD:
+    """
+    Limita cuántas peticiones simultáneas se hacen a un servidor y ajusta ese
+    límite según su respuesta (aumento aditivo / disminución multiplicativa):
+
+    - Mientras la latencia se mantiene estable, el límite crece en ~1 por
+      cada ventana completa de peticiones.
+    - Ante un rechazo por saturación (429/503) o un error, el límite se
+      multiplica por 'factor_reduccion', como mucho una vez por latencia
+      media, para no desplomarlo por varios fallos de la misma ráfaga.
+    """
+
+    def __init__(
+        self,
+        inicial=4,
+        minimo=1,
+        maximo=32,
+        factor_reduccion=0.5,
+        tolerancia_latencia=1.5,
+    ):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.factor_reduccion = factor_reduccion
+        self.tolerancia_latencia = tolerancia_latencia
+        self.limite = float(max(minimo, min(inicial, maximo)))
+        self.latencia_media = None
+        self.limite_maximo_alcanzado = self.limite
+        self.reducciones = 0
+        self._en_uso = 0
+        self._ultima_reduccion = 0.0
+        self._condicion = threading.Condition()
+
+    def adquirir(self):
+        """
+        Bloquea hasta que haya un hueco dentro del límite actual.
+        """
+        with self._condicion:
+            while self._en_uso >= int(self.limite):
+                self._condicion.wait()
+            self._en_uso += 1
+
+    def liberar(self, latencia, saturado=False):
+        """
+        Libera el hueco y ajusta el límite con el resultado de la petición:
+        su latencia en segundos y si el servidor indicó saturación o error.
+        """
+        with self._condicion:
+            self._en_uso -= 1
+            ahora = time.monotonic()
+
+            if saturado:
+                ventana = self.latencia_media or 0.0
+                if ahora - self._ultima_reduccion >= ventana:
+                    self.limite = max(self.minimo, self.limite * self.factor_reduccion)
+                    self._ultima_reduccion = ahora
+                    self.reducciones += 1
+            else:
+                estable = (
+                    self.latencia_media is None
+                    or latencia <= self.latencia_media * self.tolerancia_latencia
+                )
+                if estable:
+                    self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+                    self.limite_maximo_alcanzado = max(
+                        self.limite_maximo_alcanzado, self.limite
+                    )
+                # Media móvil exponencial de la latencia de las peticiones correctas
+                if self.latencia_media is None:
+                    self.latencia_media = latencia
+                else:
+                    self.latencia_media = 0.8 * self.latencia_media + 0.2 * latencia
+
+            self._condicion.notify_all()
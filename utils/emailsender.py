@@ -1,85 +1,579 @@
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import socket
+import queue
+import threading
+import time
+import base64
+import functools
+import mimetypes
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.utils import encode_rfc2231, formatdate, make_msgid
 import json
 import logging
 import os
 
+from utils import metrics
 
-def send_reports(reportes_generados, config):
+# Bytes del adjunto que se leen y codifican a la vez: múltiplo de 57, que en
+# base64 son las 76 columnas de una línea MIME
+BLOQUE_BASE64 = 57 * 1024
+
+PLANTILLA_HTML = """<html>
+<body>
+<p>Estimados,</p>
+<p>{parrafo}</p>
+<p>Este es un correo generado automáticamente por el sistema de RPA.</p>
+<p>Saludos cordiales.</p>
+</body>
+</html>
+"""
+# Párrafo principal según (aviso de "sin cambios", varias zonas)
+PARRAFOS = {
+    (False, False): "Se adjunta el reporte de verificación de anexos para la {zonas}.",
+    (
+        False,
+        True,
+    ): "Se adjuntan los reportes de verificación de anexos para las {zonas}.",
+    (True, False): "El reporte de verificación de anexos de la {zonas} no tiene "
+    "cambios desde el último envío.",
+    (True, True): "Los reportes de verificación de anexos de las {zonas} no tienen "
+    "cambios desde el último envío.",
+}
+
+
+class PoolSMTP:
     """
-    Envía los reportes generados a los correos correspondientes por zona.
+    Pool de conexiones SMTP autenticadas que se reutilizan entre hilos.
+    Las conexiones se abren bajo demanda hasta 'tamano' y se descartan si
+    fallan, de modo que el siguiente envío abre una nueva.
+    """
+
+    def __init__(self, servidor, puerto, usuario, password, tamano=3, usar_tls=True):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.usar_tls = usar_tls
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamano)
+
+    def _conectar(self):
+        server = smtplib.SMTP(self.servidor, self.puerto, timeout=60)
+        if self.usar_tls:
+            server.starttls()
+        if self.password:
+            server.login(self.usuario, self.password)
+        return server
+
+    def obtener(self):
+        """
+        Devuelve una conexión libre, esperando si todas están en uso.
+        """
+        self._cupos.acquire()
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            try:
+                return self._conectar()
+            except Exception:
+                self._cupos.release()
+                raise
+
+    def devolver(self, server, valida=True):
+        """
+        Devuelve la conexión al pool, o la cierra si quedó en mal estado.
+        """
+        if valida:
+            self._libres.put(server)
+        else:
+            try:
+                server.close()
+            except Exception:
+                pass
+        self._cupos.release()
+
+    def cerrar(self):
+        while True:
+            try:
+                server = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+def _es_error_transitorio(error):
+    """
+    Los errores de conexión y las respuestas 4xx se reintentan; los rechazos
+    permanentes (5xx, destinatarios inválidos) no.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, socket.error))
+
+
+def _lineas_base64(datos):
+    codificado = base64.b64encode(datos)
+    return (
+        b"\r\n".join(codificado[i : i + 76] for i in range(0, len(codificado), 76))
+        + b"\r\n"
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _cuerpo_html(zonas, aviso):
+    """
+    Parte HTML ya codificada del correo de unas zonas; se renderiza una sola
+    vez por combinación de zonas (los reintentos y las ejecuciones periódicas
+    del drenado de la cola la reutilizan).
+    """
+    if len(zonas) == 1:
+        texto = f"<b>zona {zonas[0]}</b>"
+    else:
+        texto = "zonas " + ", ".join(f"<b>{zona}</b>" for zona in zonas)
+    parrafo = PARRAFOS[(aviso, len(zonas) > 1)].format(zonas=texto)
+    html = PLANTILLA_HTML.format(parrafo=parrafo)
+    return (
+        b'Content-Type: text/html; charset="utf-8"\r\n'
+        b"Content-Transfer-Encoding: base64\r\n\r\n"
+        + _lineas_base64(html.encode("utf-8"))
+    )
+
+
+def _cabecera_adjunto(ruta):
+    nombre = os.path.basename(ruta)
+    tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+    if nombre.isascii():
+        parametro = f'filename="{nombre}"'
+    else:
+        parametro = f"filename*={encode_rfc2231(nombre, 'utf-8')}"
+    return (
+        f'Content-Type: {tipo}; name="{nombre}"\r\n'
+        "Content-Transfer-Encoding: base64\r\n"
+        f"Content-Disposition: attachment; {parametro}\r\n\r\n"
+    ).encode("utf-8")
+
+
+class MensajeCorreo:
+    """
+    Correo multipart con la parte HTML y los adjuntos codificados en base64.
+    partes() genera el mensaje por bloques leyendo cada adjunto del disco,
+    de modo que nunca hay una copia completa del mensaje en memoria.
+    """
+
+    def __init__(self, remitente, destinatarios, asunto, cuerpo, adjuntos=()):
+        self.remitente = remitente
+        self.destinatarios = destinatarios
+        self.asunto = asunto
+        self.cuerpo = cuerpo
+        self.adjuntos = list(adjuntos)
+        self.temporales = []
+        self._separador = f"=={make_msgid().strip('<>')}"
+
+    def _cabeceras(self):
+        asunto = Header(self.asunto, "utf-8").encode()
+        cabeceras = [
+            f"From: {self.remitente}",
+            f"To: {', '.join(self.destinatarios)}",
+            f"Subject: {asunto}",
+            f"Date: {formatdate(localtime=True)}",
+            f"Message-ID: {make_msgid()}",
+            "MIME-Version: 1.0",
+            f'Content-Type: multipart/mixed; boundary="{self._separador}"',
+        ]
+        texto = "\r\n".join(cabeceras).replace("\n ", "\r\n ")
+        # Las líneas que empiezan por un punto se duplican (RFC 5321)
+        texto = re.sub(r"(?m)^\.", "..", texto)
+        return (texto + "\r\n\r\n").encode("utf-8")
+
+    def partes(self):
+        separador = f"--{self._separador}\r\n".encode("ascii")
+        yield self._cabeceras()
+        yield separador + self.cuerpo
+        for ruta in self.adjuntos:
+            yield separador + _cabecera_adjunto(ruta)
+            with open(ruta, "rb") as f:
+                while datos := f.read(BLOQUE_BASE64):
+                    yield _lineas_base64(datos)
+        yield f"--{self._separador}--\r\n".encode("ascii")
+
+    def as_bytes(self):
+        return b"".join(self.partes())
+
+    def limpiar(self):
+        """
+        Borra las carpetas temporales (zip de los adjuntos).
+        """
+        for carpeta in self.temporales:
+            shutil.rmtree(carpeta, ignore_errors=True)
+        self.temporales = []
+
+
+def _comprimir_adjuntos(rutas, zonas):
+    """
+    Empaqueta los adjuntos en un zip temporal y devuelve su ruta.
+    """
+    nombre = "Reportes_" + "_".join(
+        re.sub(r"[^\w-]", "", zona.split(" (")[0]) for zona in zonas
+    )
+    carpeta = tempfile.mkdtemp(prefix="rpa_correo_")
+    ruta_zip = os.path.join(carpeta, f"{nombre[:100]}.zip")
+    with zipfile.ZipFile(ruta_zip, "w", zipfile.ZIP_DEFLATED) as archivo:
+        for ruta in rutas:
+            archivo.write(ruta, os.path.basename(ruta))
+    return ruta_zip
+
+
+def _construir_mensaje(
+    sender_email, destinatarios, subject_prefix, zonas, rutas, comprimir_mb=0
+):
+    """
+    Correo de una o varias zonas con los mismos destinatarios. Sin rutas
+    (rutas None) es el aviso de "sin cambios", sin adjuntos. Con
+    'comprimir_mb' > 0, si los adjuntos suman más de esos MB se envían
+    dentro de un único zip.
+    """
+    zonas = tuple(zonas)
+    aviso = rutas is None
+    rutas = [] if aviso else list(rutas)
+    mensaje = MensajeCorreo(
+        sender_email,
+        destinatarios,
+        f"{subject_prefix} - {', '.join(zonas)}",
+        _cuerpo_html(zonas, aviso),
+        rutas,
+    )
+    if rutas and comprimir_mb > 0:
+        if sum(os.path.getsize(ruta) for ruta in rutas) > comprimir_mb * 2**20:
+            ruta_zip = _comprimir_adjuntos(rutas, zonas)
+            mensaje.adjuntos = [ruta_zip]
+            mensaje.temporales = [os.path.dirname(ruta_zip)]
+    return mensaje
+
+
+def _transmitir(server, sender_email, destinatarios, mensaje):
+    """
+    Como SMTP.sendmail, pero envía el contenido del mensaje a medida que se
+    genera. Devuelve (bytes enviados, {destinatario: (código, respuesta)}
+    de los destinatarios que el servidor rechazó).
+    """
+    server.ehlo_or_helo_if_needed()
+    codigo, respuesta = server.mail(sender_email)
+    if codigo != 250:
+        raise smtplib.SMTPSenderRefused(codigo, respuesta, sender_email)
+    rechazados = {}
+    for destinatario in destinatarios:
+        codigo, respuesta = server.rcpt(destinatario)
+        if codigo not in (250, 251):
+            rechazados[destinatario] = (codigo, respuesta)
+    if len(rechazados) == len(destinatarios):
+        raise smtplib.SMTPRecipientsRefused(rechazados)
+    codigo, respuesta = server.docmd("data")
+    if codigo != 354:
+        raise smtplib.SMTPDataError(codigo, respuesta)
+    enviados = 0
+    for bloque in mensaje.partes():
+        server.send(bloque)
+        enviados += len(bloque)
+    server.send(b".\r\n")
+    codigo, respuesta = server.getreply()
+    if codigo != 250:
+        raise smtplib.SMTPDataError(codigo, respuesta)
+    return enviados, rechazados
+
+
+def _enviar_con_reintentos(pool, mensaje, reintentos, espera):
     """
+    Envía un mensaje usando una conexión del pool. Reintenta los errores
+    transitorios con espera exponencial (espera, 2*espera, 4*espera...).
+    Devuelve (intentos realizados, último error o None si se envió,
+    destinatarios rechazados por el servidor).
+    """
+    intento = 0
+    while True:
+        intento += 1
+        server = None
+        try:
+            server = pool.obtener()
+            enviados, rechazados = _transmitir(
+                server, mensaje.remitente, mensaje.destinatarios, mensaje
+            )
+            pool.devolver(server)
+            metrics.incrementar("bytes_smtp", enviados)
+            return intento, None, rechazados
+        except Exception as e:
+            if server is not None:
+                pool.devolver(server, valida=False)
+            if intento > reintentos or not _es_error_transitorio(e):
+                return intento, e, {}
+            pausa = espera * 2 ** (intento - 1)
+            logging.warning(
+                f"Fallo transitorio al enviar a {', '.join(mensaje.destinatarios)} "
+                f"(intento {intento}): {e}. Reintentando en {pausa:g} s."
+            )
+            metrics.incrementar("reintentos_smtp")
+            time.sleep(pausa)
+
+
+def _agrupar_envios(envios, agrupar=True):
+    """
+    Agrupa los envíos {clave: (zona, destinatarios, ruta)} en correos.
+    Con 'agrupar', las zonas con la misma lista de destinatarios van en un
+    solo correo con varios adjuntos (los avisos de "sin cambios", aparte).
+    Devuelve una lista de (claves, zonas, destinatarios, rutas o None).
+    """
+    grupos = {}
+    for clave, (zona, destinatarios, ruta) in envios.items():
+        aviso = ruta is None
+        if agrupar:
+            id_grupo = (tuple(sorted(set(destinatarios))), aviso)
+        else:
+            id_grupo = (clave,)
+        claves, zonas, _, rutas = grupos.setdefault(
+            id_grupo, ([], [], destinatarios, None if aviso else [])
+        )
+        claves.append(clave)
+        zonas.append(zona)
+        if not aviso:
+            rutas.append(ruta)
+    return list(grupos.values())
+
+
+def cargar_mapeo_correos(config, proyecto=None):
+    """
+    Lee el mapeo {zona: [destinatarios]} (el del proyecto, si se indica) o
+    devuelve None si no es válido.
+    """
+    file_mapping = config.get("Archivos", "archivo_mapeo_adm")
+    if proyecto:
+        file_mapping = config.get(
+            f"Proyecto:{proyecto}", "archivo_mapeo_adm", fallback=file_mapping
+        )
     try:
-        file_mapping = config.get("Archivos", "archivo_mapeo_adm")
         with open(file_mapping, "r", encoding="utf-8") as f:
-            email_map = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
         logging.error(
             f"No se encontró el archivo '{file_mapping}'. No se enviarán correos."
         )
-        return
     except json.JSONDecodeError:
         logging.error(f"Error al decodificar '{file_mapping}'. Verifique el formato.")
-        return
+    return None
+
+
+def _opciones_envio(config):
+    return {
+        "agrupar": config.getboolean(
+            "Email", "agrupar_por_destinatarios", fallback=True
+        ),
+        "comprimir_mb": config.getfloat("Email", "comprimir_adjuntos_mb", fallback=0),
+    }
+
+
+def guardar_correos(reportes_generados, config, carpeta, email_map=None):
+    """
+    Simulación de envío: construye los mismos correos que send_reports y los
+    guarda como archivos .eml en 'carpeta' en lugar de enviarlos.
+    Devuelve {zona: ruta del .eml}.
+    """
+    if email_map is None:
+        email_map = cargar_mapeo_correos(config)
+        if email_map is None:
+            return {}
+    if not os.path.exists(carpeta):
+        os.makedirs(carpeta)
+
+    sender_email = config.get("Email", "sender_email")
+    subject_prefix = config.get("Email", "subject_prefix")
+    opciones = _opciones_envio(config)
+    envios = {}
+    for zona, ruta_reporte in reportes_generados.items():
+        if zona not in email_map:
+            logging.warning(
+                f"No se encontró mapeo de correo para la zona '{zona}'. No se generará el correo."
+            )
+            continue
+        envios[zona] = (zona, email_map[zona], ruta_reporte)
+
+    correos = {}
+    for claves, zonas, destinatarios, rutas in _agrupar_envios(
+        envios, opciones["agrupar"]
+    ):
+        mensaje = _construir_mensaje(
+            sender_email,
+            destinatarios,
+            subject_prefix,
+            zonas,
+            rutas,
+            opciones["comprimir_mb"],
+        )
+        nombre = os.path.splitext(os.path.basename(rutas[0]))[0] if rutas else "aviso"
+        if len(zonas) > 1:
+            nombre += f"_y_{len(zonas) - 1}_mas"
+        ruta_eml = os.path.join(carpeta, nombre + ".eml")
+        try:
+            with open(ruta_eml, "wb") as f:
+                for bloque in mensaje.partes():
+                    f.write(bloque)
+        finally:
+            mensaje.limpiar()
+        for zona in claves:
+            correos[zona] = ruta_eml
+        logging.info(
+            f"Correo de {', '.join(zonas)} para {', '.join(destinatarios)} guardado en '{ruta_eml}'."
+        )
+    return correos
+
+
+def enviar_lote(envios, config):
+    """
+    Envía un lote de correos {clave: (zona, destinatarios, ruta del reporte)}
+    sobre un único pool de conexiones SMTP, en paralelo y reintentando los
+    fallos transitorios. Una ruta None envía el aviso de "sin cambios".
+    Las zonas con los mismos destinatarios comparten correo (ver
+    _agrupar_envios) y cada clave recibe el resultado de su correo.
+    Devuelve {clave: {"enviado": bool, "intentos": int, "error": str | None,
+    "rechazados": {destinatario: respuesta del servidor}}}; un correo
+    enviado puede tener destinatarios rechazados que no lo recibieron.
+    """
+    if not envios:
+        return {}
 
     sender_email = config.get("Email", "sender_email")
     sender_password = config.get("Email", "sender_password")
     smtp_server = config.get("Email", "smtp_server")
     smtp_port = int(config.get("Email", "smtp_port"))
     subject_prefix = config.get("Email", "subject_prefix")
+    usar_tls = config.getboolean("Email", "usar_tls", fallback=True)
+    conexiones = config.getint("Email", "conexiones", fallback=3)
+    reintentos = config.getint("Email", "reintentos", fallback=3)
+    espera = config.getfloat("Email", "espera_reintento", fallback=2)
+    opciones = _opciones_envio(config)
+    correos = _agrupar_envios(envios, opciones["agrupar"])
+
+    pool = PoolSMTP(
+        smtp_server, smtp_port, sender_email, sender_password, conexiones, usar_tls
+    )
 
+    def enviar(correo):
+        _, zonas, destinatarios, rutas = correo
+        descripcion = ", ".join(zonas)
+        try:
+            mensaje = _construir_mensaje(
+                sender_email,
+                destinatarios,
+                subject_prefix,
+                zonas,
+                rutas,
+                opciones["comprimir_mb"],
+            )
+        except Exception as e:
+            logging.error(f"No se pudo preparar el correo de '{descripcion}': {e}")
+            return {"enviado": False, "intentos": 0, "error": str(e), "rechazados": {}}
+
+        try:
+            intentos, error, rechazados = _enviar_con_reintentos(
+                pool, mensaje, reintentos, espera
+            )
+        finally:
+            mensaje.limpiar()
+        if error is not None:
+            logging.error(
+                f"Error al enviar el correo de '{descripcion}' tras {intentos} intentos: {error}"
+            )
+            metrics.incrementar("correos_fallidos")
+            return {
+                "enviado": False,
+                "intentos": intentos,
+                "error": str(error),
+                "rechazados": {},
+            }
+
+        rechazados = {
+            destinatario: f"{codigo} {respuesta.decode('utf-8', 'replace')}"
+            for destinatario, (codigo, respuesta) in rechazados.items()
+        }
+        for destinatario, respuesta in rechazados.items():
+            logging.warning(
+                f"El servidor rechazó el destinatario '{destinatario}' del correo "
+                f"de '{descripcion}': {respuesta}"
+            )
+        aceptados = [d for d in destinatarios if d not in rechazados]
+        logging.info(f"Correo de '{descripcion}' enviado a: {', '.join(aceptados)}")
+        metrics.incrementar("correos_enviados")
+        return {
+            "enviado": True,
+            "intentos": intentos,
+            "error": None,
+            "rechazados": rechazados,
+        }
+
+    resultados = {}
+    inicio = time.perf_counter()
     try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        logging.info("Conexión exitosa con el servidor SMTP.")
-
-        for zona, ruta_reporte in reportes_generados.items():
-            if zona in email_map:
-                destinatarios = email_map[zona]
-
-                msg = MIMEMultipart()
-                msg["From"] = sender_email
-                msg["To"] = ", ".join(destinatarios)
-                msg["Subject"] = f"{subject_prefix} - {zona}"
-
-                body = f"""
-                <html>
-                <body>
-                <p>Estimados,</p>
-                <p>Se adjunta el reporte de verificación de anexos para la <b>zona {zona}</b>.</p>
-                <p>Este es un correo generado automáticamente por el sistema de RPA.</p>
-                <p>Saludos cordiales.</p>
-                </body>
-                </html>
-                """
-                msg.attach(MIMEText(body, "html"))
-
-                with open(ruta_reporte, "rb") as attachment:
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(attachment.read())
-
-                encoders.encode_base64(part)
-                part.add_header(
-                    "Content-Disposition",
-                    f"attachment; filename= {os.path.basename(ruta_reporte)}",
-                )
-                msg.attach(part)
-
-                server.sendmail(sender_email, destinatarios, msg.as_string())
-                logging.info(
-                    f"Correo para la zona '{zona}' enviado a: {', '.join(destinatarios)}"
-                )
-            else:
-                logging.warning(
-                    f"No se encontró mapeo de correo para la zona '{zona}'. No se enviará el reporte."
-                )
-
-        server.quit()
-        logging.info("Conexión con el servidor SMTP cerrada.")
-
-    except Exception as e:
-        logging.error(f"Error al enviar correos electrónicos: {e}", exc_info=True)
+        with ThreadPoolExecutor(max_workers=conexiones) as executor:
+            for correo, resultado in zip(correos, executor.map(enviar, correos)):
+                for clave in correo[0]:
+                    resultados[clave] = dict(resultado)
+    finally:
+        pool.cerrar()
+        logging.info("Conexiones con el servidor SMTP cerradas.")
+
+    segundos = time.perf_counter() - inicio
+    enviados = sum(1 for r in resultados.values() if r["enviado"])
+    logging.info(
+        f"Se enviaron {enviados} de {len(envios)} reportes en {len(correos)} correos "
+        f"en {segundos:.2f} s ({len(correos) / segundos if segundos else 0:.1f} mensajes/s)."
+    )
+    return resultados
+
+
+def sin_mapeo(zona):
+    """
+    Resultado de envío de una zona sin destinatarios en el mapeo de correos.
+    """
+    logging.warning(
+        f"No se encontró mapeo de correo para la zona '{zona}'. No se enviará el reporte."
+    )
+    return {
+        "enviado": False,
+        "intentos": 0,
+        "error": "Sin mapeo de correo",
+        "rechazados": {},
+    }
+
+
+def send_reports(reportes_generados, config, email_map=None):
+    """
+    Envía los reportes generados a los correos correspondientes por zona.
+    Una zona con ruta None recibe un aviso de "sin cambios" sin adjunto.
+    Si no se indica 'email_map' se usa el de [Archivos] archivo_mapeo_adm.
+
+    Los envíos se hacen en paralelo sobre un pool de conexiones SMTP y cada
+    mensaje se reintenta ante fallos transitorios. Devuelve un diccionario
+    {zona: resultado} con el formato de enviar_lote.
+    """
+    if email_map is None:
+        email_map = cargar_mapeo_correos(config)
+        if email_map is None:
+            return {}
+
+    resultados = {}
+    envios = {}
+    for zona, ruta_reporte in reportes_generados.items():
+        if zona in email_map:
+            envios[zona] = (zona, email_map[zona], ruta_reporte)
+        else:
+            resultados[zona] = sin_mapeo(zona)
+
+    resultados.update(enviar_lote(envios, config))
+    return resultados
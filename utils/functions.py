@@ -1,9 +1,18 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import hashlib
+import re
 import logging
 from datetime import datetime, timedelta
 import time
 import unicodedata
+from difflib import SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
+
+from utils import metrics
 
 
 def leer_checklist(nombre_archivo):
@@ -22,70 +31,220 @@ def leer_checklist(nombre_archivo):
         return None
 
 
-def process_incidents(df, checklist_path):
+def normalizar_nombre_anexo(nombre):
     """
-    Procesa el DataFrame de incidencias para verificar los anexos.
-    Reutiliza y mejora la lógica de 'analisis.py'.
+    Normaliza un nombre de anexo o de fichero para compararlo: quita la
+    extensión y las tildes, pasa a minúsculas y lo divide en palabras.
+    Devuelve la tupla de palabras.
     """
-    checklist = leer_checklist(checklist_path)
-    if not checklist:
-        return pd.DataFrame()
+    base = quitar_tildes_auto(os.path.splitext(str(nombre))[0]).lower()
+    return tuple(re.findall(r"[a-z0-9]+", base))
+
+
+def construir_indice_checklist(checklist):
+    """
+    Construye, una vez por ejecución, el índice de nombres normalizados del
+    checklist: {"palabras unidas por espacio": [posiciones en el checklist]}.
+    """
+    indice = {}
+    for posicion, anexo in enumerate(checklist):
+        clave = " ".join(normalizar_nombre_anexo(anexo))
+        if clave:
+            indice.setdefault(clave, []).append(posicion)
+    return indice
 
-    lista_reporte = []
 
-    # Columnas obligatorias que deben existir en el DataFrame de Redmine
-    columnas_obligatorias = [
-        "Ticket",
-        "Incidencia",
-        "Fecha Incidencia",
-        "Zona",
-        "Asunto",
-        "Ficheros",
-        "Causa",
-        "Tipo de causa",
-    ]
+def anexos_de_fichero(nombre_fichero, indice, umbral_similitud=None):
+    """
+    Devuelve las posiciones del checklist que corresponden a un fichero.
+
+    Si el nombre del fichero coincide exactamente con un anexo, solo cuenta
+    para ese anexo. Si no, cuenta para cada anexo cuyas palabras aparezcan
+    seguidas dentro del nombre ("Anexo A firmado.pdf" -> "Anexo A", pero no
+    "Anexo Alberto.pdf"). Cada comprobación es una búsqueda en el índice.
+    Con 'umbral_similitud' (0-1), un fichero sin coincidencias se asigna al
+    anexo más parecido si supera ese umbral, para tolerar errores de escritura.
+    """
+    palabras = normalizar_nombre_anexo(nombre_fichero)
+    clave = " ".join(palabras)
+    if clave in indice:
+        return list(indice[clave])
+
+    posiciones = []
+    for inicio in range(len(palabras)):
+        for fin in range(inicio + 1, len(palabras) + 1):
+            posiciones.extend(indice.get(" ".join(palabras[inicio:fin]), ()))
+    if posiciones or not umbral_similitud or not clave or not indice:
+        return posiciones
+
+    similitud, mejor = max(
+        (SequenceMatcher(None, clave, candidato).ratio(), candidato)
+        for candidato in indice
+    )
+    if similitud >= umbral_similitud:
+        logging.info(
+            f"Fichero '{nombre_fichero}' asignado por similitud ({similitud:.2f}) al anexo '{mejor}'."
+        )
+        return list(indice[mejor])
+    return []
+
+
+def _como_lista_ficheros(valor):
+    """
+    Acepta la lista de ficheros de la extracción o, por compatibilidad con
+    datos guardados anteriormente, el texto unido por ", ".
+    """
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return list(valor)
+    if isinstance(valor, str):
+        return [nombre for nombre in valor.split(", ") if nombre]
+    return []
+
 
+def _matriz_anexos(ficheros, n_anexos, indice, umbral_similitud=None, resueltos=None):
+    """
+    Matriz uint8 (filas x anexos, 1 = presente) de una serie de listas de
+    ficheros. Cada nombre de fichero distinto se resuelve una sola vez contra
+    el índice del checklist; 'resueltos' permite reutilizar esas resoluciones
+    entre bloques de una misma ejecución.
+    """
+    if resueltos is None:
+        resueltos = {}
+    serie = pd.Series([_como_lista_ficheros(valor) for valor in ficheros], dtype=object)
+    serie = serie.explode().dropna()
+    codigos, nombres_unicos = pd.factorize(serie)
+
+    # Matriz (ficheros distintos x anexos) y OR por fila de la incidencia
+    por_nombre = np.zeros((len(nombres_unicos), n_anexos), dtype="uint8")
+    for codigo, nombre in enumerate(nombres_unicos):
+        if nombre not in resueltos:
+            resueltos[nombre] = anexos_de_fichero(nombre, indice, umbral_similitud)
+        por_nombre[codigo, resueltos[nombre]] = 1
+
+    matriz = np.zeros((len(ficheros), n_anexos), dtype="uint8")
+    np.maximum.at(matriz, serie.index.to_numpy(dtype="int64"), por_nombre[codigos])
+    return matriz
+
+
+# Columnas obligatorias que deben existir en el DataFrame de Redmine
+COLUMNAS_OBLIGATORIAS = [
+    "Ticket",
+    "Incidencia",
+    "Fecha Incidencia",
+    "Zona",
+    "Asunto",
+    "Ficheros",
+    "Causa",
+    "Tipo de causa",
+]
+COLUMNAS_DATOS = [col for col in COLUMNAS_OBLIGATORIAS if col != "Ficheros"]
+# Columnas con pocos valores distintos: se guardan como categóricas
+COLUMNAS_CATEGORICAS = ["Zona", "Causa", "Tipo de causa"]
+
+
+def _columnas_validas(df):
     # Verificar que todas las columnas existan
-    for col in columnas_obligatorias:
+    for col in COLUMNAS_OBLIGATORIAS:
         if col not in df.columns:
             logging.error(
                 f"La columna requerida '{col}' no se encontró en los datos de Redmine."
             )
-            return pd.DataFrame()
+            return False
+    return True
+
+
+def _procesar_bloque(df, checklist, indice, umbral_similitud, resueltos):
+    """
+    Columnas de datos del bloque más una columna uint8 por anexo.
+    """
+    df_bloque = df[COLUMNAS_DATOS].reset_index(drop=True)
+    matriz = _matriz_anexos(
+        df["Ficheros"], len(checklist), indice, umbral_similitud, resueltos
+    )
+    return pd.concat([df_bloque, pd.DataFrame(matriz, columns=checklist)], axis=1)
+
+
+def _compactar(df_final):
+    """
+    Convierte las columnas repetitivas en categóricas y renombra las
+    columnas para el reporte final.
+    """
+    for col in COLUMNAS_CATEGORICAS:
+        df_final[col] = df_final[col].astype("category")
+
+    # Renombrar columnas para el reporte final
+    df_final = df_final.rename(columns={"Tipo de causa": "Tipo de Causa"})
+
+    metrics.incrementar("filas_procesadas", len(df_final))
+    return df_final
+
+
+def process_incidents(df, checklist_path, umbral_similitud=None):
+    """
+    Procesa el DataFrame de incidencias para verificar los anexos.
+    Reutiliza y mejora la lógica de 'analisis.py'.
+    Con 'umbral_similitud' se activa la coincidencia aproximada de nombres.
+    """
+    checklist = leer_checklist(checklist_path)
+    if not checklist:
+        return pd.DataFrame()
+
+    if not _columnas_validas(df):
+        return pd.DataFrame()
 
     total_filas = len(df)
     logging.info(f"Iniciando procesamiento de {total_filas} incidencias.")
 
-    for index, row in df.iterrows():
-        fila_reporte = {
-            "Ticket": row["Ticket"],
-            "Incidencia": row["Incidencia"],
-            "Fecha Incidencia": row["Fecha Incidencia"],
-            "Zona": row["Zona"],
-            "Asunto": row["Asunto"],
-            "Causa": row["Causa"],
-            "Tipo de causa": row["Tipo de causa"],
-        }
-
-        ficheros_texto = str(row["Ficheros"]).lower()
+    indice = construir_indice_checklist(checklist)
+    df_final = _procesar_bloque(df, checklist, indice, umbral_similitud, {})
+    return _compactar(df_final)
 
-        for anexo_requerido in checklist:
-            # Comparamos el nombre base del anexo (sin extensión)
-            nombre_anexo_base = os.path.splitext(anexo_requerido)[0].lower()
 
-            fila_reporte[anexo_requerido] = (
-                1 if nombre_anexo_base in ficheros_texto else 0
-            )
+def process_incidents_por_bloques(bloques, checklist_path, umbral_similitud=None):
+    """
+    Igual que process_incidents, pero consume las incidencias por bloques
+    (listas de diccionarios, p. ej. las páginas de la extracción) sin
+    construir nunca el DataFrame completo de la extracción: de cada bloque
+    solo se conservan las columnas del reporte en formato compacto.
+    """
+    checklist = leer_checklist(checklist_path)
+    if not checklist:
+        return pd.DataFrame()
 
-        lista_reporte.append(fila_reporte)
+    indice = construir_indice_checklist(checklist)
+    resueltos = {}
+    partes = []
+    for bloque in bloques:
+        if not len(bloque):
+            continue
+        df_bloque = pd.DataFrame(bloque)
+        if not partes and not _columnas_validas(df_bloque):
+            return pd.DataFrame()
+        parte = _procesar_bloque(
+            df_bloque, checklist, indice, umbral_similitud, resueltos
+        )
+        for col in COLUMNAS_CATEGORICAS:
+            parte[col] = parte[col].astype("category")
+        partes.append(parte)
+        del df_bloque
 
-    columnas_finales = columnas_obligatorias[:5] + columnas_obligatorias[6:] + checklist
-    df_final = pd.DataFrame(lista_reporte, columns=columnas_finales)
+    if not partes:
+        return pd.DataFrame()
 
-    # Renombrar columnas para el reporte final
-    df_final = df_final.rename(columns={"Tipo de causa": "Tipo de Causa"})
+    # Mismas categorías en todos los bloques para que concat no las
+    # convierta de nuevo en texto (object)
+    for col in COLUMNAS_CATEGORICAS:
+        categorias = union_categoricals(
+            [parte[col] for parte in partes], sort_categories=True
+        ).categories
+        for parte in partes:
+            parte[col] = parte[col].cat.set_categories(categorias)
 
-    return df_final
+    n_bloques = len(partes)
+    df_final = pd.concat(partes, ignore_index=True)
+    del partes[:]
+    logging.info(f"Se procesaron {len(df_final)} incidencias en {n_bloques} bloques.")
+    return _compactar(df_final)
 
 
 def quitar_tildes_auto(texto):
@@ -99,62 +258,358 @@ def quitar_tildes_auto(texto):
     return texto_normalizado.encode("ascii", "ignore").decode("utf-8")
 
 
-def generate_reports(df_reporte, ruta_base):
+# Columnas fijas al inicio de cada reporte; el resto son los anexos del checklist
+COLUMNAS_REPORTE = [
+    "Ticket",
+    "Incidencia",
+    "Fecha Incidencia",
+    "Zona",
+    "Asunto",
+    "Causa",
+    "Tipo de Causa",
+]
+
+
+def _filas_excel(df):
+    """
+    Recorre las filas del DataFrame como tuplas listas para escribir en Excel
+    (los valores nulos se convierten en celdas vacías).
+    """
+    df = df.astype(object).where(df.notna(), None)
+    return df.itertuples(index=False, name=None)
+
+
+def _abrir_libro(ruta, motor):
+    if motor == "xlsxwriter":
+        import xlsxwriter
+
+        return xlsxwriter.Workbook(ruta, {"constant_memory": True})
+
+    from openpyxl import Workbook
+
+    return Workbook(write_only=True)
+
+
+def _escribir_hoja(libro, nombre, df, motor):
+    """
+    Añade al libro una hoja con el DataFrame, escrita fila a fila.
+    """
+    if motor == "xlsxwriter":
+        hoja = libro.add_worksheet(nombre)
+        negrita = libro.add_format({"bold": True, "border": 1})
+        hoja.write_row(0, 0, list(df.columns), negrita)
+        for numero, fila in enumerate(_filas_excel(df), start=1):
+            hoja.write_row(numero, 0, fila)
+        return
+
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    hoja = libro.create_sheet(nombre)
+    encabezado = []
+    for columna in df.columns:
+        celda = WriteOnlyCell(hoja, value=columna)
+        celda.font = Font(bold=True)
+        encabezado.append(celda)
+    hoja.append(encabezado)
+    for fila in _filas_excel(df):
+        hoja.append(fila)
+
+
+def _guardar_libro(libro, ruta, motor):
+    if motor == "xlsxwriter":
+        libro.close()
+    else:
+        libro.save(ruta)
+
+
+def _escribir_excel(df, ruta, motor="openpyxl"):
+    """
+    Escribe el DataFrame en un xlsx fila a fila, sin construir el libro
+    completo en memoria. 'motor' puede ser "openpyxl" (modo write-only) o
+    "xlsxwriter" (modo constant_memory, más rápido si está instalado).
+    """
+    libro = _abrir_libro(ruta, motor)
+    _escribir_hoja(libro, "Sheet1", df, motor)
+    _guardar_libro(libro, ruta, motor)
+
+
+def _escribir_reporte_zona(zona, df_zona, ruta_completa, motor):
+    """
+    Tarea del pool de procesos: escribe el reporte de una zona.
+    Devuelve (zona, ruta, segundos, error) para que el proceso principal
+    registre el resultado (los procesos hijos no comparten el logging).
+    """
+    inicio = time.perf_counter()
+    try:
+        _escribir_excel(df_zona, ruta_completa, motor)
+        return zona, ruta_completa, time.perf_counter() - inicio, None
+    except Exception as e:
+        return zona, ruta_completa, time.perf_counter() - inicio, str(e)
+
+
+# Hoja con los porcentajes de cumplimiento al inicio del libro consolidado
+HOJA_RESUMEN = "Resumen"
+# Excel limita los nombres de hoja a 31 caracteres y no admite []:*?/\
+MAX_NOMBRE_HOJA = 31
+CARACTERES_NO_VALIDOS_HOJA = re.compile(r"[\[\]:*?/\\]")
+
+
+def _nombre_hoja(nombre, usados):
+    """
+    Nombre de hoja válido y único (sin distinguir mayúsculas) en el libro.
+    """
+    base = CARACTERES_NO_VALIDOS_HOJA.sub("_", str(nombre)).strip("'")
+    base = base[:MAX_NOMBRE_HOJA] or "Hoja"
+    candidato = base
+    numero = 2
+    while candidato.lower() in usados:
+        sufijo = f" ({numero})"
+        candidato = base[: MAX_NOMBRE_HOJA - len(sufijo)] + sufijo
+        numero += 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def resumen_cumplimiento(df_reporte, anexos):
+    """
+    Porcentajes de cumplimiento por zona, con una agregación por groupby
+    sobre las columnas del checklist: incidencias, % con todos los anexos,
+    % de anexos presentes y % de incidencias que tienen cada anexo. La
+    última fila es el total de todas las zonas.
+    """
+    zonas = df_reporte["Zona"]
+    presentes = df_reporte[anexos]
+    por_anexo = presentes.groupby(zonas, observed=True).mean() * 100
+    completas = presentes.all(axis=1).groupby(zonas, observed=True).mean() * 100
+    incidencias = zonas.groupby(zonas, observed=True).size()
+
+    resumen = pd.DataFrame(
+        {
+            "Incidencias": incidencias,
+            "% Completas": completas,
+            "% Anexos": por_anexo.mean(axis=1),
+        }
+    ).join(por_anexo)
+    # Total ponderado por el número de incidencias de cada zona
+    pesos = incidencias / incidencias.sum()
+    total = resumen.drop(columns="Incidencias").mul(pesos, axis=0).sum()
+    total["Incidencias"] = incidencias.sum()
+    resumen.loc["Total"] = total
+
+    resumen = resumen.round(1)
+    resumen["Incidencias"] = resumen["Incidencias"].astype("int64")
+    resumen.index = resumen.index.astype(str)
+    return resumen.rename_axis("Zona").reset_index()
+
+
+def _escribir_libro_consolidado(df_reporte, hojas, anexos, ruta, motor):
+    """
+    Escribe el libro consolidado: la hoja de resumen y una hoja por zona.
+    Devuelve (ruta, segundos, error), como _escribir_reporte_zona.
+    """
+    inicio = time.perf_counter()
+    try:
+        libro = _abrir_libro(ruta, motor)
+        usados = set()
+        _escribir_hoja(
+            libro,
+            _nombre_hoja(HOJA_RESUMEN, usados),
+            resumen_cumplimiento(df_reporte, anexos),
+            motor,
+        )
+        for zona, df_zona in sorted(hojas, key=lambda hoja: str(hoja[0])):
+            _escribir_hoja(libro, _nombre_hoja(zona, usados), df_zona, motor)
+        _guardar_libro(libro, ruta, motor)
+        return ruta, time.perf_counter() - inicio, None
+    except Exception as e:
+        return ruta, time.perf_counter() - inicio, str(e)
+
+
+def _motor_excel_disponible(motor):
+    if motor == "xlsxwriter":
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            logging.warning(
+                "El motor 'xlsxwriter' no está instalado. Se usará openpyxl."
+            )
+            return "openpyxl"
+    return motor
+
+
+# Huellas del contenido del último reporte enviado de cada zona y de los
+# generados que aún no consta que se hayan enviado
+ARCHIVO_HUELLAS = "huellas_reportes.json"
+ARCHIVO_HUELLAS_PENDIENTES = "huellas_pendientes.json"
+
+
+def calcular_huellas_zonas(df_reporte):
+    """
+    Calcula una huella (SHA-256) del contenido procesado de cada zona:
+    columnas, filas y resultados del checklist. No depende del orden de las
+    filas, de modo que dos ejecuciones con los mismos datos dan la misma huella.
+    """
+    huellas = {}
+    for zona, df_zona in df_reporte.groupby("Zona", sort=False, observed=True):
+        df_zona = df_zona.sort_values("Ticket")
+        huella = hashlib.sha256("\x1f".join(map(str, df_zona.columns)).encode("utf-8"))
+        huella.update(pd.util.hash_pandas_object(df_zona, index=False).values.tobytes())
+        huellas[zona] = huella.hexdigest()
+    return huellas
+
+
+def leer_huellas(ruta_base, archivo=ARCHIVO_HUELLAS):
+    """
+    Devuelve las huellas {zona: huella} del último reporte de cada zona.
+    """
+    ruta = os.path.join(ruta_base, archivo)
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(
+            f"No se pudieron leer las huellas de los reportes '{ruta}': {e}. "
+            "Se regenerarán todas las zonas."
+        )
+        return {}
+
+
+def guardar_huellas(ruta_base, huellas, archivo=ARCHIVO_HUELLAS):
+    """
+    Actualiza las huellas guardadas con las de las zonas indicadas.
+    """
+    if not os.path.exists(ruta_base):
+        os.makedirs(ruta_base)
+    _escribir_huellas(
+        ruta_base, archivo, {**leer_huellas(ruta_base, archivo), **huellas}
+    )
+
+
+def _escribir_huellas(ruta_base, archivo, huellas):
+    ruta = os.path.join(ruta_base, archivo)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(huellas, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def confirmar_huellas(ruta_base, zonas):
+    """
+    Pasa las huellas pendientes de las zonas indicadas (cuyo reporte ya se
+    envió) a las huellas guardadas, con las que se decide si una zona cambió.
+    Devuelve el número de huellas confirmadas.
+    """
+    pendientes = leer_huellas(ruta_base, ARCHIVO_HUELLAS_PENDIENTES)
+    confirmadas = {zona: pendientes.pop(zona) for zona in zonas if zona in pendientes}
+    if confirmadas:
+        guardar_huellas(ruta_base, confirmadas)
+        _escribir_huellas(ruta_base, ARCHIVO_HUELLAS_PENDIENTES, pendientes)
+    return len(confirmadas)
+
+
+def generate_reports(
+    df_reporte,
+    ruta_base,
+    max_workers=None,
+    motor="openpyxl",
+    omitir_zonas=None,
+    consolidado=False,
+):
     """
     Genera un archivo Excel de reporte por cada zona.
+
+    Los datos se reparten por zona en una sola pasada (groupby) y los libros
+    se escriben en paralelo en un pool de procesos. 'max_workers' limita el
+    número de procesos (por defecto, uno por zona hasta el número de CPUs;
+    1 escribe en el proceso actual). Las zonas de 'omitir_zonas' no se
+    escriben. Devuelve {zona: ruta del reporte}.
+
+    Con 'consolidado', de la misma pasada sale además un único libro con
+    una hoja de resumen (cumplimiento por zona y por anexo) y una hoja por
+    zona, incluidas las omitidas. Se escribe en el proceso actual mientras
+    el pool escribe los reportes por zona.
     """
     if not os.path.exists(ruta_base):
         os.makedirs(ruta_base)
         logging.info(f"Directorio de reportes creado en: {ruta_base}")
 
-    zonas = df_reporte["Zona"].unique()
-    reportes_generados = {}
+    motor = _motor_excel_disponible(motor)
+
+    # Orden de columnas para el reporte final (igual para todas las zonas)
+    anexos = [col for col in df_reporte.columns if col not in COLUMNAS_REPORTE]
+    columnas_reporte = COLUMNAS_REPORTE + anexos
+    fecha_actual = datetime.now().strftime("%Y%m%d")
 
-    for zona in zonas:
+    tareas = []
+    hojas = []
+    for zona, df_zona in df_reporte.groupby(
+        "Zona", sort=False, dropna=False, observed=True
+    ):
         if pd.isna(zona):
             logging.warning("Se encontró una zona con valor Nulo. Se omitirá.")
             continue
-
-        df_zona = df_reporte[df_reporte["Zona"] == zona]
-
-        # Orden de columnas para el reporte final
-        columnas_reporte = [
-            "Ticket",
-            "Incidencia",
-            "Fecha Incidencia",
-            "Zona",
-            "Asunto",
-            "Causa",
-            "Tipo de Causa",
-        ] + [
-            col
-            for col in df_zona.columns
-            if col
-            not in [
-                "Ticket",
-                "Incidencia",
-                "Fecha Incidencia",
-                "Zona",
-                "Asunto",
-                "Causa",
-                "Tipo de Causa",
-            ]
-        ]
-
         df_zona = df_zona[columnas_reporte]
+        if consolidado:
+            hojas.append((zona, df_zona))
+        if omitir_zonas and zona in omitir_zonas:
+            logging.info(
+                f"La zona '{zona}' no cambió desde el último reporte. No se regenerará."
+            )
+            continue
 
-        fecha_actual = datetime.now().strftime("%Y%m%d")
         nombre_archivo = (
             f"Reporte_Verificacion_{quitar_tildes_auto(zona)}_{fecha_actual}.xlsx"
         )
         ruta_completa = os.path.join(ruta_base, nombre_archivo)
+        tareas.append((zona, df_zona, ruta_completa, motor))
 
-        try:
-            df_zona.to_excel(ruta_completa, index=False)
-            logging.info(f"Reporte para la zona '{zona}' generado en: {ruta_completa}")
+    def escribir_consolidado():
+        if not consolidado:
+            return None
+        ruta = os.path.join(ruta_base, f"Reporte_Consolidado_{fecha_actual}.xlsx")
+        return _escribir_libro_consolidado(df_reporte, hojas, anexos, ruta, motor)
+
+    if max_workers is None:
+        max_workers = min(len(tareas), os.cpu_count() or 1)
+
+    if max_workers > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [
+                executor.submit(_escribir_reporte_zona, *tarea) for tarea in tareas
+            ]
+            resultado_consolidado = escribir_consolidado()
+            resultados = [futuro.result() for futuro in futuros]
+    else:
+        resultados = [_escribir_reporte_zona(*tarea) for tarea in tareas]
+        resultado_consolidado = escribir_consolidado()
+
+    reportes_generados = {}
+    for zona, ruta_completa, segundos, error in resultados:
+        if error is None:
+            logging.info(
+                f"Reporte para la zona '{zona}' generado en: {ruta_completa} ({segundos:.2f} s)"
+            )
             reportes_generados[zona] = ruta_completa
-        except Exception as e:
-            logging.error(f"No se pudo guardar el reporte para la zona '{zona}': {e}")
+            metrics.incrementar("reportes_generados")
+            metrics.incrementar("bytes_escritos", os.path.getsize(ruta_completa))
+        else:
+            logging.error(
+                f"No se pudo guardar el reporte para la zona '{zona}': {error}"
+            )
+
+    if resultado_consolidado is not None:
+        ruta_completa, segundos, error = resultado_consolidado
+        if error is None:
+            logging.info(
+                f"Reporte consolidado de {len(hojas)} zonas generado en: "
+                f"{ruta_completa} ({segundos:.2f} s)"
+            )
+            metrics.incrementar("bytes_escritos", os.path.getsize(ruta_completa))
+        else:
+            logging.error(f"No se pudo guardar el reporte consolidado: {error}")
 
     return reportes_generados
 
@@ -189,6 +644,7 @@ def cleanup_old_reports(folder_path, days_to_keep):
                         os.remove(file_path)
                         logging.info(f"Archivo antiguo eliminado: {filename}")
                         files_deleted_count += 1
+                        metrics.incrementar("archivos_eliminados")
                     except Exception as e:
                         logging.error(f"No se pudo eliminar el archivo {filename}: {e}")
 
@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+
+
+class IssueStore:
+    """
+    Almacén local (SQLite) de las incidencias normalizadas por RedmineConnector.
+    Guarda una fila por proyecto y ticket con su fecha de actualización en
+    Redmine (el filtro project_id de Redmine incluye los subproyectos, así que
+    un ticket puede pertenecer a varios proyectos configurados), y marcas de
+    sincronización por proyecto para las extracciones incrementales.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        carpeta = os.path.dirname(ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+        with self._conectar() as conn:
+            clave = [
+                fila[1]
+                for fila in conn.execute("PRAGMA table_info(incidencias)")
+                if fila[5]
+            ]
+            if clave == ["ticket"]:
+                # Almacenes creados cuando la clave era solo el ticket; la
+                # migración se hace en una sola transacción
+                conn.execute("BEGIN")
+                conn.execute("ALTER TABLE incidencias RENAME TO incidencias_v1")
+                conn.execute("DROP INDEX IF EXISTS ix_incidencias_proyecto")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS incidencias (
+                    ticket INTEGER NOT NULL,
+                    proyecto TEXT NOT NULL,
+                    creado TEXT,
+                    actualizado TEXT,
+                    vigente INTEGER NOT NULL DEFAULT 1,
+                    datos TEXT NOT NULL,
+                    PRIMARY KEY (proyecto, ticket)
+                )
+                """)
+            if clave == ["ticket"]:
+                conn.execute(
+                    "INSERT INTO incidencias "
+                    "SELECT ticket, proyecto, creado, actualizado, vigente, datos "
+                    "FROM incidencias_v1"
+                )
+                conn.execute("DROP TABLE incidencias_v1")
+                logging.info(
+                    f"Almacén local '{ruta}' migrado a una fila por proyecto y ticket."
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_incidencias_proyecto "
+                "ON incidencias (proyecto, vigente, creado)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS marcas (clave TEXT PRIMARY KEY, valor TEXT)"
+            )
+            conn.commit()
+
+    def _conectar(self):
+        return closing(sqlite3.connect(self.ruta))
+
+    def obtener_marca(self, clave):
+        """
+        Devuelve el valor de una marca de sincronización o None si no existe.
+        """
+        with self._conectar() as conn:
+            fila = conn.execute(
+                "SELECT valor FROM marcas WHERE clave = ?", (clave,)
+            ).fetchone()
+        return fila[0] if fila else None
+
+    def guardar_marca(self, clave, valor):
+        with self._conectar() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO marcas (clave, valor) VALUES (?, ?)",
+                (clave, valor),
+            )
+
+    def guardar(self, proyecto, issues):
+        """
+        Inserta o actualiza las incidencias recibidas del proyecto y las marca
+        como vigentes.
+        """
+        filas = [
+            (
+                issue["Ticket"],
+                str(proyecto),
+                issue.get("Creado"),
+                issue.get("Actualizado"),
+                json.dumps(issue, ensure_ascii=False, default=str),
+            )
+            for issue in issues
+        ]
+        with self._conectar() as conn, conn:
+            conn.executemany(
+                """
+                INSERT INTO incidencias (ticket, proyecto, creado, actualizado, vigente, datos)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (proyecto, ticket) DO UPDATE SET
+                    creado = excluded.creado,
+                    actualizado = excluded.actualizado,
+                    vigente = 1,
+                    datos = excluded.datos
+                """,
+                filas,
+            )
+        return len(filas)
+
+    def marcar_baja(self, proyecto, tickets):
+        """
+        Marca como no vigentes (lápida) las incidencias del proyecto que ya no
+        cumplen el filtro de extracción. Se conservan para poder reactivarlas
+        después.
+        """
+        with self._conectar() as conn, conn:
+            cursor = conn.executemany(
+                "UPDATE incidencias SET vigente = 0 "
+                "WHERE proyecto = ? AND ticket = ? AND vigente = 1",
+                [(str(proyecto), ticket) for ticket in tickets],
+            )
+        return cursor.rowcount
+
+    def reemplazar(self, proyecto, issues, desde, hasta):
+        """
+        Sincronización completa: guarda las incidencias recibidas y marca como
+        baja cualquier otra del proyecto creada en el rango [desde, hasta].
+        """
+        self.guardar(proyecto, issues)
+        vigentes = {issue["Ticket"] for issue in issues}
+        with self._conectar() as conn:
+            existentes = [
+                fila[0]
+                for fila in conn.execute(
+                    "SELECT ticket FROM incidencias WHERE proyecto = ? AND vigente = 1 "
+                    "AND substr(creado, 1, 10) BETWEEN ? AND ?",
+                    (str(proyecto), desde, hasta),
+                )
+            ]
+        return self.marcar_baja(proyecto, (t for t in existentes if t not in vigentes))
+
+    def cargar(self, proyecto, desde, hasta):
+        """
+        Devuelve las incidencias vigentes del proyecto creadas en el rango
+        [desde, hasta] (fechas 'YYYY-MM-DD'), ordenadas por ticket.
+        """
+        return [
+            issue for bloque in self.iterar(proyecto, desde, hasta) for issue in bloque
+        ]
+
+    def iterar(self, proyecto, desde, hasta, tamano_bloque=1000):
+        """
+        Igual que cargar, pero genera las incidencias en listas de
+        'tamano_bloque' a medida que se leen, sin cargarlas todas a la vez.
+        """
+        total = 0
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "SELECT datos FROM incidencias WHERE proyecto = ? AND vigente = 1 "
+                "AND substr(creado, 1, 10) BETWEEN ? AND ? ORDER BY ticket",
+                (str(proyecto), desde, hasta),
+            )
+            for filas in iter(lambda: cursor.fetchmany(tamano_bloque), []):
+                total += len(filas)
+                yield [json.loads(fila[0]) for fila in filas]
+        logging.info(
+            f"Se cargaron {total} incidencias vigentes del almacén local '{self.ruta}'."
+        )
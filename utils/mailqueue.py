@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import zipfile
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from utils.emailsender import cargar_mapeo_correos, enviar_lote, sin_mapeo
+
+
+class ColaCorreo:
+    """
+    Cola persistente (SQLite) de reportes pendientes de envío.
+
+    Cada reporte generado se copia a la carpeta de la cola y se registra
+    como pendiente, de modo que sobrevive a caídas del servidor SMTP y a la
+    limpieza de reportes antiguos. La clave de cada entrega es el nombre del
+    archivo (zona + fecha, precedido del proyecto si lo hay) más la huella
+    de su contenido: un mismo reporte nunca se encola ni se envía dos
+    veces, pero un reporte regenerado con otro contenido el mismo día
+    reemplaza a la entrega anterior de la zona y se vuelve a enviar.
+    """
+
+    def __init__(self, ruta_bd, carpeta_adjuntos):
+        self.ruta_bd = ruta_bd
+        self.carpeta_adjuntos = carpeta_adjuntos
+        for carpeta in (os.path.dirname(ruta_bd), carpeta_adjuntos):
+            if carpeta and not os.path.exists(carpeta):
+                os.makedirs(carpeta)
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entregas (
+                    clave TEXT PRIMARY KEY,
+                    zona TEXT NOT NULL,
+                    proyecto TEXT,
+                    ruta TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    ultimo_error TEXT,
+                    huella TEXT,
+                    creado TEXT NOT NULL,
+                    actualizado TEXT NOT NULL
+                )
+                """)
+            columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(entregas)")]
+            if "proyecto" not in columnas:
+                # Colas creadas antes de admitir varios proyectos
+                conn.execute("ALTER TABLE entregas ADD COLUMN proyecto TEXT")
+            if "huella" not in columnas:
+                # Colas creadas cuando la clave era solo el nombre del archivo
+                conn.execute("ALTER TABLE entregas ADD COLUMN huella TEXT")
+            conn.commit()
+
+    def _conectar(self):
+        return closing(sqlite3.connect(self.ruta_bd))
+
+    def encolar(self, reportes_generados, proyecto=None):
+        """
+        Registra los reportes {zona: ruta} como entregas pendientes. Un
+        reporte igual a la última entrega pendiente o enviada de su zona (y
+        proyecto) se omite; si no, las entregas pendientes anteriores de la
+        zona quedan reemplazadas por el reporte nuevo.
+        Devuelve el número de entregas encoladas.
+        """
+        ahora = datetime.now().isoformat(timespec="seconds")
+        encoladas = 0
+        carpeta = self.carpeta_adjuntos
+        if proyecto:
+            carpeta = os.path.join(carpeta, proyecto)
+            if not os.path.exists(carpeta):
+                os.makedirs(carpeta)
+        with self._conectar() as conn, conn:
+            for zona, ruta_reporte in reportes_generados.items():
+                nombre = os.path.basename(ruta_reporte)
+                clave, huella = self._clave(ruta_reporte, proyecto)
+                ultima = conn.execute(
+                    "SELECT clave FROM entregas WHERE zona = ? AND proyecto IS ? "
+                    "AND estado IN ('pendiente', 'enviado') "
+                    "ORDER BY rowid DESC LIMIT 1",
+                    (zona, proyecto),
+                ).fetchone()
+                if ultima and ultima[0] == clave:
+                    logging.info(
+                        f"El reporte '{nombre}' ya estaba en la cola de correo "
+                        "con el mismo contenido. Se omitirá."
+                    )
+                    continue
+
+                # Una subcarpeta por contenido: el reporte de la entrega
+                # reemplazada puede tener el mismo nombre de archivo
+                carpeta_reporte = os.path.join(carpeta, huella[:16])
+                if not os.path.exists(carpeta_reporte):
+                    os.makedirs(carpeta_reporte)
+                ruta_cola = os.path.join(carpeta_reporte, nombre)
+                shutil.copy2(ruta_reporte, ruta_cola)
+                conn.execute(
+                    "UPDATE entregas SET estado = 'reemplazado', actualizado = ? "
+                    "WHERE zona = ? AND proyecto IS ? AND estado = 'pendiente'",
+                    (ahora, zona, proyecto),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO entregas "
+                    "(clave, zona, proyecto, ruta, huella, creado, actualizado) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (clave, zona, proyecto, ruta_cola, huella, ahora, ahora),
+                )
+                encoladas += 1
+        return encoladas
+
+    @staticmethod
+    def _clave(ruta_reporte, proyecto=None):
+        """
+        Devuelve (clave de entrega, huella del contenido) de un reporte.
+        """
+        huella = huella_reporte(ruta_reporte)
+        clave = f"{os.path.basename(ruta_reporte)}#{huella[:16]}"
+        if proyecto:
+            clave = f"{proyecto}/{clave}"
+        return clave, huella
+
+    def enviadas(self, reportes_generados, proyecto=None):
+        """
+        Devuelve las zonas de los reportes {zona: ruta} cuyo contenido ya
+        se envió (en esta ejecución o en un drenado anterior).
+        """
+        claves = {
+            zona: self._clave(ruta, proyecto)[0]
+            for zona, ruta in reportes_generados.items()
+            if os.path.exists(ruta)
+        }
+        with self._conectar() as conn:
+            return {
+                zona
+                for zona, clave in claves.items()
+                if conn.execute(
+                    "SELECT 1 FROM entregas WHERE clave = ? AND estado = 'enviado'",
+                    (clave,),
+                ).fetchone()
+            }
+
+    def pendientes(self):
+        """
+        Devuelve las entregas pendientes como lista de (clave, zona, ruta, proyecto).
+        """
+        with self._conectar() as conn:
+            return conn.execute(
+                "SELECT clave, zona, ruta, proyecto FROM entregas WHERE estado = 'pendiente' "
+                "ORDER BY creado"
+            ).fetchall()
+
+    def registrar_resultado(self, clave, enviado, error=None, estado=None):
+        """
+        Guarda el resultado de un intento de envío. Sin 'estado', la entrega
+        queda enviada o sigue pendiente según 'enviado'.
+        """
+        if estado is None:
+            estado = "enviado" if enviado else "pendiente"
+        ahora = datetime.now().isoformat(timespec="seconds")
+        with self._conectar() as conn, conn:
+            conn.execute(
+                "UPDATE entregas SET estado = ?, intentos = intentos + 1, "
+                "ultimo_error = ?, actualizado = ? WHERE clave = ?",
+                (estado, error, ahora, clave),
+            )
+
+    def depurar(self, dias_caducidad):
+        """
+        Da por caducadas las entregas pendientes más antiguas que
+        'dias_caducidad' y borra los adjuntos que ya no se van a enviar.
+        """
+        limite = (datetime.now() - timedelta(days=dias_caducidad)).isoformat()
+        with self._conectar() as conn, conn:
+            caducadas = conn.execute(
+                "UPDATE entregas SET estado = 'caducado' "
+                "WHERE estado = 'pendiente' AND creado < ?",
+                (limite,),
+            ).rowcount
+            rutas = [
+                fila[0]
+                for fila in conn.execute(
+                    "SELECT ruta FROM entregas WHERE estado != 'pendiente'"
+                )
+            ]
+        if caducadas:
+            logging.warning(
+                f"Se descartaron {caducadas} entregas con más de {dias_caducidad} días sin enviarse."
+            )
+        for ruta in rutas:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+                carpeta = os.path.dirname(ruta)
+                if os.path.normpath(carpeta) != os.path.normpath(
+                    self.carpeta_adjuntos
+                ) and not os.listdir(carpeta):
+                    os.rmdir(carpeta)
+
+
+def huella_reporte(ruta):
+    """
+    Huella (SHA-256) del contenido de un reporte xlsx: las hojas y estilos
+    del paquete, sin docProps/, que guarda la fecha de creación del libro.
+    Si el archivo no es un xlsx, huella del archivo completo.
+    """
+    contenido = hashlib.sha256()
+    try:
+        with zipfile.ZipFile(ruta) as paquete:
+            for nombre in sorted(paquete.namelist()):
+                if nombre.startswith("docProps/"):
+                    continue
+                contenido.update(nombre.encode("utf-8"))
+                contenido.update(paquete.read(nombre))
+    except zipfile.BadZipFile:
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                contenido.update(bloque)
+    return contenido.hexdigest()
+
+
+def drenar_cola(cola, config):
+    """
+    Intenta enviar todas las entregas pendientes de la cola, de todos los
+    proyectos y sobre un único pool SMTP, y registra el resultado de cada
+    una. No regenera ningún reporte.
+    Devuelve {clave: resultado} con el formato de send_reports.
+    """
+    pendientes = cola.pendientes()
+    if not pendientes:
+        return {}
+
+    logging.info(
+        f"Enviando {len(pendientes)} reportes pendientes de la cola de correo."
+    )
+    mapas = {}
+    envios = {}
+    resultados = {}
+    for clave, zona, ruta, proyecto in pendientes:
+        if proyecto not in mapas:
+            mapas[proyecto] = cargar_mapeo_correos(config, proyecto) or {}
+        destinatarios = mapas[proyecto].get(zona)
+        if destinatarios is None:
+            # Estado final: reintentarlo no cambia el resultado
+            resultados[clave] = sin_mapeo(zona)
+            cola.registrar_resultado(
+                clave, False, resultados[clave]["error"], estado="sin_destinatarios"
+            )
+            continue
+        etiqueta = f"{zona} ({proyecto})" if proyecto else zona
+        envios[clave] = (etiqueta, destinatarios, ruta)
+    resultados_envio = enviar_lote(envios, config)
+    resultados.update(resultados_envio)
+
+    for clave, resultado in resultados_envio.items():
+        error = resultado["error"]
+        if resultado["rechazados"]:
+            # Enviado, pero sin llegar a todos: queda constancia en la entrega
+            error = "Destinatarios rechazados: " + "; ".join(
+                f"{destinatario} ({respuesta})"
+                for destinatario, respuesta in resultado["rechazados"].items()
+            )
+        cola.registrar_resultado(clave, resultado["enviado"], error)
+
+    cola.depurar(config.getint("ColaCorreo", "caducidad_dias", fallback=5))
+    return resultados
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+
+class MetricasEjecucion:
+    """
+    Tiempos por etapa y contadores de una ejecución de main_job (o de
+    otro 'tipo' de ejecución, como un reproceso).
+    Es seguro incrementar contadores desde varios hilos.
+    """
+
+    def __init__(self, tipo="main_job"):
+        self.tipo = tipo
+        # Con microsegundos: dos ejecuciones en el mismo segundo no comparten
+        # carpeta de puntos de control (y los run_id siguen ordenándose)
+        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.inicio = time.time()
+        self.etapas = {}
+        self.contadores = defaultdict(int)
+        self.estado = "en_curso"
+        self.ultima_etapa = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """
+        Mide la duración de una etapa; se registra aunque la etapa falle.
+        """
+        anterior = getattr(self._local, "etapa", None)
+        self._local.etapa = self.ultima_etapa = nombre
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            with self._lock:
+                self.etapas[nombre] = self.etapas.get(nombre, 0.0) + segundos
+            logging.info(f"Etapa '{nombre}' completada en {segundos:.2f} s.")
+            self._local.etapa = anterior
+
+    def etapa_actual(self):
+        """
+        Etapa en curso en este hilo o, en los hilos de un pool (que no la
+        heredan), la última etapa iniciada.
+        """
+        return getattr(self._local, "etapa", None) or self.ultima_etapa
+
+    def incrementar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] += cantidad
+
+    def registro(self):
+        """
+        Devuelve el registro estructurado de la ejecución.
+        """
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "tipo": self.tipo,
+                "inicio": datetime.fromtimestamp(self.inicio).isoformat(
+                    timespec="seconds"
+                ),
+                "duracion_segundos": round(time.time() - self.inicio, 3),
+                "estado": self.estado,
+                "etapas": {k: round(v, 3) for k, v in self.etapas.items()},
+                "contadores": dict(self.contadores),
+            }
+
+    def escribir_registro(self, ruta):
+        """
+        Añade el registro de la ejecución como una línea JSON al archivo.
+        """
+        _crear_carpeta(ruta)
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.registro(), ensure_ascii=False) + "\n")
+
+    def exportar_prometheus(self, ruta):
+        """
+        Escribe las métricas de la última ejecución en formato de texto de
+        Prometheus (para el textfile collector de node_exporter).
+        """
+        registro = self.registro()
+        lineas = [
+            "# HELP rpa_ejecucion_inicio_timestamp Inicio de la última ejecución (epoch).",
+            "# TYPE rpa_ejecucion_inicio_timestamp gauge",
+            f"rpa_ejecucion_inicio_timestamp {self.inicio:.0f}",
+            "# HELP rpa_ejecucion_exito 1 si la última ejecución terminó con éxito.",
+            "# TYPE rpa_ejecucion_exito gauge",
+            f"rpa_ejecucion_exito {1 if registro['estado'] == 'exito' else 0}",
+            "# HELP rpa_ejecucion_duracion_segundos Duración total de la última ejecución.",
+            "# TYPE rpa_ejecucion_duracion_segundos gauge",
+            f"rpa_ejecucion_duracion_segundos {registro['duracion_segundos']}",
+            "# HELP rpa_etapa_duracion_segundos Duración de cada etapa en la última ejecución.",
+            "# TYPE rpa_etapa_duracion_segundos gauge",
+        ]
+        lineas += [
+            f'rpa_etapa_duracion_segundos{{etapa="{etapa}"}} {segundos}'
+            for etapa, segundos in registro["etapas"].items()
+        ]
+        lineas += [
+            "# HELP rpa_contador Contadores de la última ejecución.",
+            "# TYPE rpa_contador gauge",
+        ]
+        lineas += [
+            f'rpa_contador{{nombre="{nombre}"}} {valor}'
+            for nombre, valor in sorted(registro["contadores"].items())
+        ]
+
+        _crear_carpeta(ruta)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        os.replace(temporal, ruta)
+
+
+def _crear_carpeta(ruta):
+    carpeta = os.path.dirname(ruta)
+    if carpeta and not os.path.exists(carpeta):
+        os.makedirs(carpeta)
+
+
+# Métricas de la ejecución en curso; los módulos incrementan contadores aquí.
+_actual = MetricasEjecucion()
+
+
+def iniciar_ejecucion(tipo="main_job"):
+    """
+    Empieza un registro de métricas nuevo para una ejecución y lo devuelve.
+    """
+    global _actual
+    _actual = MetricasEjecucion(tipo)
+    return _actual
+
+
+def actual():
+    return _actual
+
+
+def incrementar(nombre, cantidad=1):
+    _actual.incrementar(nombre, cantidad)
+
+
+def medir_etapa(nombre):
+    """
+    Decorador equivalente a 'with actual().etapa(nombre)'.
+    """
+
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _actual.etapa(nombre):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
@@ -1,9 +1,97 @@
 from redminelib import Redmine
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
+from requests.exceptions import (
+    ConnectionError as RequestsConnectionError,
+    HTTPError,
+    Timeout,
+)
+from utils.concurrencia import ControladorAIMD
+from utils.attachmentcache import CacheAdjuntos
+from utils import metrics
 import os
+import threading
+import time
+
+# Tamaño de página máximo que admite la API REST de Redmine
+PAGE_SIZE = 100
+# Reintentos de una página cuando Redmine responde con saturación (modo adaptativo)
+REINTENTOS_PAGINA = 5
+# Tiempo máximo de espera de cada petición HTTP a Redmine (segundos)
+TIMEOUT_HTTP = 60
+
+
+def _es_saturacion(error):
+    """
+    Indica si el error es un rechazo temporal del servidor (429, 5xx,
+    conexión rechazada o caducada) que merece reducir la concurrencia.
+    """
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code in (429, 500, 502, 503, 504)
+    return isinstance(error, (RequestsConnectionError, Timeout))
+
+
+def _ficheros_pdf(issue):
+    """
+    Nombres de los adjuntos PDF de una incidencia JSON de Redmine.
+    """
+    return [
+        att["filename"]
+        for att in issue.get("attachments", ())
+        if att["filename"].lower().endswith(".pdf")
+    ]
+
+
+class TramoFechas:
+    """
+    Subrango [inicio, fin] (fechas incluidas) de la ventana de created_on
+    que se extrae por separado, con sus páginas descargadas pendientes de
+    entregar.
+    """
+
+    def __init__(self, inicio, fin):
+        self.inicio = inicio
+        self.fin = fin
+        self.total = None
+        self.paginas = {}
+        self.siguiente = 0
+
+    def __str__(self):
+        return f"{self.inicio:%Y-%m-%d}|{self.fin:%Y-%m-%d}"
+
+    @property
+    def filtro(self):
+        return f"><{self}"
+
+    @property
+    def dias(self):
+        return (self.fin - self.inicio).days + 1
+
+    def dividir(self):
+        """
+        Devuelve las dos mitades del tramo (debe abarcar más de un día).
+        """
+        mitad = self.inicio + timedelta(days=self.dias // 2 - 1)
+        return [
+            TramoFechas(self.inicio, mitad),
+            TramoFechas(mitad + timedelta(days=1), self.fin),
+        ]
+
+
+def planificar_tramos(inicio, fin, dias_tramo):
+    """
+    Divide el rango [inicio, fin] en tramos consecutivos de 'dias_tramo' días.
+    """
+    tramos = []
+    while inicio <= fin:
+        final_tramo = min(fin, inicio + timedelta(days=max(1, dias_tramo) - 1))
+        tramos.append(TramoFechas(inicio, final_tramo))
+        inicio = final_tramo + timedelta(days=1)
+    return tramos
 
 
 class RedmineConnector:
@@ -12,9 +100,16 @@ class RedmineConnector:
     optimizada con ThreadPoolExecutor para concurrencia I/O.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, proyecto=None, compartir_con=None):
         """
         Inicializa la conexión a Redmine y carga la configuración.
+
+        Con 'proyecto' se usan el project_id y el mapeo de campos de la
+        sección [Proyecto:<proyecto>]. Con 'compartir_con' se reutiliza la
+        sesión HTTP (y su pool de conexiones) de otro conector ya autenticado,
+        junto con su límite de peticiones simultáneas: las extracciones de
+        todos los conectores que comparten la sesión suman como mucho
+        max_conexiones peticiones y, en modo adaptativo, se frenan juntas.
         """
         try:
             self.url = config.get("Redmine", "url")
@@ -23,173 +118,618 @@ class RedmineConnector:
                 "X-Redmine-API-Key": self.api_key,
                 "Content-Type": "application/json",
             }
-            # Objeto Redmine principal para la llamada inicial
-            self.redmine = Redmine(
-                self.url,
-                key=self.api_key,
-                requests={"verify": False, "headers": self.headers},
+            self.modo_extraccion = config.get(
+                "Redmine", "modo_extraccion", fallback="fijo"
+            )
+            self.max_conexiones = config.getint(
+                "Redmine", "max_conexiones", fallback=32
             )
-            self.redmine.auth()
+            self.concurrencia_inicial = config.getint(
+                "Redmine", "concurrencia_inicial", fallback=4
+            )
+            if compartir_con is not None:
+                self.redmine = compartir_con.redmine
+                self.controlador = compartir_con.controlador
+                self._conexiones = compartir_con._conexiones
+            else:
+                # Objeto Redmine principal para la llamada inicial
+                self.redmine = Redmine(
+                    self.url,
+                    key=self.api_key,
+                    requests={"verify": False, "headers": self.headers},
+                )
+                # Pool de conexiones HTTP dimensionado para los hilos de extracción
+                adaptador = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.max_conexiones
+                )
+                self.redmine.engine.session.mount("http://", adaptador)
+                self.redmine.engine.session.mount("https://", adaptador)
+                self.redmine.auth()
+                # Los hilos esperan en el controlador, que decide cuántas
+                # peticiones simultáneas admite Redmine en cada momento; en
+                # modo fijo, el semáforo no deja pasar más peticiones que
+                # conexiones tiene el pool.
+                self.controlador = None
+                if self.modo_extraccion == "adaptativo":
+                    self.controlador = ControladorAIMD(
+                        inicial=self.concurrencia_inicial, maximo=self.max_conexiones
+                    )
+                self._conexiones = threading.BoundedSemaphore(self.max_conexiones)
             self.dia_corte = config.getint(
                 "Redmine", "dia_corte_mes_anterior", fallback=5
             )
-            self.project_id = config.get("Redmine", "project_id")
+            seccion = f"Proyecto:{proyecto}" if proyecto else "Redmine"
+            self.project_id = config.get(seccion, "project_id")
+            self.dias_tramo = config.getint("Redmine", "dias_tramo", fallback=7)
+            self.max_incidencias_tramo = config.getint(
+                "Redmine", "max_incidencias_tramo", fallback=1000
+            )
+            self.total_count = 0
+            self.cache_adjuntos = None
+            if config.getboolean("CacheAdjuntos", "habilitada", fallback=False):
+                ruta_cache = config.get("CacheAdjuntos", "ruta", fallback=None) or None
+                if ruta_cache and proyecto:
+                    # Una caché por proyecto: cada extracción persiste la suya
+                    base, extension = os.path.splitext(ruta_cache)
+                    ruta_cache = f"{base}_{proyecto}{extension}"
+                self.cache_adjuntos = CacheAdjuntos(
+                    config.getint("CacheAdjuntos", "max_entradas", fallback=50000),
+                    ruta_cache,
+                )
+            self.dias_resync_completo = config.getint(
+                "Sincronizacion", "dias_resync_completo", fallback=7
+            )
 
+            seccion_mapeo = config.get(seccion, "mapeo", fallback="MapeoCamposRedmine")
             self.maps_dict = {
-                "incidencia": int(config.get("MapeoCamposRedmine", "incidencia")),
-                "fecha_incidencia": int(
-                    config.get("MapeoCamposRedmine", "fecha_incidencia")
-                ),
-                "zona": int(config.get("MapeoCamposRedmine", "zona")),
-                "causa": int(config.get("MapeoCamposRedmine", "causa")),
-                "tipo_causa": int(config.get("MapeoCamposRedmine", "tipo_causa")),
+                "incidencia": int(config.get(seccion_mapeo, "incidencia")),
+                "fecha_incidencia": int(config.get(seccion_mapeo, "fecha_incidencia")),
+                "zona": int(config.get(seccion_mapeo, "zona")),
+                "causa": int(config.get(seccion_mapeo, "causa")),
+                "tipo_causa": int(config.get(seccion_mapeo, "tipo_causa")),
             }
 
+            self._ids_campos = set(self.maps_dict.values())
+
             logging.info("Conexión con Redmine establecida y configuración cargada.")
         except Exception as e:
             logging.error(f"Error al inicializar RedmineConnector: {e}", exc_info=True)
             raise
 
-    def _fetch_page(self, offset, filtro_fecha):
+    def _filtros_base(self, filtro_fecha):
         """
-        Función trabajadora que obtiene una página de incidencias.
-        Es un método de la clase para acceder a la configuración fácilmente.
+        Filtros comunes a la consulta de conteo y a la de páginas, para que
+        ambas trabajen sobre exactamente el mismo conjunto de incidencias.
         """
+        return {
+            "project_id": self.project_id,
+            "created_on": filtro_fecha,
+            # cf_21=filtro_fecha,  # Asumiendo que cf_21 es el campo de fecha de incidencia
+            # status_id=5,  # Asumiendo que el estado 5 es "Cerrado"
+            "cf_18": "PROCEDE",
+        }
 
-        processed_issues = []
-        try:
-            # Se usa el objeto Redmine de la instancia. redminelib es thread-safe para lecturas.
-            issues = self.redmine.issue.filter(
-                project_id=self.project_id,
-                created_on=filtro_fecha,
-                # cf_21=filtro_fecha,  # Asumiendo que cf_21 es el campo de fecha de incidencia
-                # status_id=5,  # Asumiendo que el estado 5 es "Cerrado"
-                cf_18="PROCEDE",
-                include=["attachments"],
-                sort="updated_on:asc",
-            )
-
-            def get_cf_value(issue, cf_id):
-                try:
-                    return next(
-                        (cf.value for cf in issue.custom_fields if cf.id == cf_id), None
-                    )
-                except (StopIteration, AttributeError):
-                    return None
-
-            for issue in issues:
-                attachments = [
-                    att.filename
-                    for att in issue.attachments
-                    if att.filename.lower().endswith(".pdf")
-                ]
-
-                issue_dict = {
-                    "Ticket": issue.id,
-                    "Asunto": issue.subject,
-                    "Incidencia": get_cf_value(issue, self.maps_dict["incidencia"]),
-                    "Fecha Incidencia": get_cf_value(
-                        issue, self.maps_dict["fecha_incidencia"]
-                    ),
-                    "Zona": get_cf_value(issue, self.maps_dict["zona"]),
-                    "Causa": get_cf_value(issue, self.maps_dict["causa"]),
-                    "Tipo de causa": get_cf_value(issue, self.maps_dict["tipo_causa"]),
-                    "Ficheros": ", ".join(attachments),
-                }
-                processed_issues.append(issue_dict)
-        except Exception as e:
-            logging.error(
-                f"Error en el hilo trabajador para el offset {offset}: {e}",
-                exc_info=True,
-            )
+    def _consultar_issues(self, filtros, offset, limit, **params):
+        """
+        Hace la petición GET /issues.json directamente sobre la sesión HTTP de
+        redminelib (mismas cabeceras y pool), sin construir objetos Resource.
+        """
+        params = dict(filtros, offset=offset, limit=limit, **params)
+        response = self.redmine.engine.session.get(
+            f"{self.url.rstrip('/')}/issues.json",
+            params=params,
+            timeout=TIMEOUT_HTTP,
+        )
+        metrics.incrementar("peticiones_http_redmine")
+        response.raise_for_status()
+        return response
 
-        return processed_issues
+    def _normalizar_issue(self, issue, ficheros=None):
+        """
+        Convierte una incidencia JSON de Redmine en el diccionario del reporte.
+        Los campos personalizados se resuelven en una sola pasada. Si no se
+        indican 'ficheros', se toman los PDF de los adjuntos de la incidencia.
+        """
+        ids_mapeados = self._ids_campos
+        valores = {
+            cf["id"]: cf.get("value")
+            for cf in issue.get("custom_fields", ())
+            if cf.get("id") in ids_mapeados
+        }
+        return {
+            "Ticket": issue["id"],
+            "Asunto": issue.get("subject"),
+            "Incidencia": valores.get(self.maps_dict["incidencia"]),
+            "Fecha Incidencia": valores.get(self.maps_dict["fecha_incidencia"]),
+            "Zona": valores.get(self.maps_dict["zona"]),
+            "Causa": valores.get(self.maps_dict["causa"]),
+            "Tipo de causa": valores.get(self.maps_dict["tipo_causa"]),
+            "Ficheros": _ficheros_pdf(issue) if ficheros is None else ficheros,
+            "Creado": issue.get("created_on"),
+            "Actualizado": issue.get("updated_on"),
+        }
 
-    def get_redmine_issues_parallel(self):
+    def _ficheros_con_cache(self, issues):
         """
-        Extrae las incidencias del mes en curso desde Redmine usando un pool de hilos.
+        Devuelve {ticket: ficheros PDF} para las incidencias recibidas (sin
+        adjuntos). Solo se piden a Redmine, en una única petición, los
+        adjuntos de los tickets que no están en caché o cambiaron.
         """
-        try:
-            limit = 100
-            today = datetime.now()
-            if today.day <= self.dia_corte:
-                # Si estamos a principio de mes, busca desde el mes anterior.
-                end_date = today
-                start_date = (today - relativedelta(months=1)).replace(day=1)
-            else:
-                # Si no, busca solo en el mes actual.
-                end_date = today
-                start_date = today.replace(day=1)
-
-            # Formatear fechas y crear el string de filtro para Redmine
-            start_date_str = start_date.strftime("%Y-%m-%d")
-            end_date_str = end_date.strftime("%Y-%m-%d")
-            filtro_fecha = f"><{start_date_str}|{end_date_str}"
-            logging.info(
-                f"Ejecución día {today.day}. Usando rango de fechas: {start_date_str} a {end_date_str}"
+        ficheros = {}
+        faltan = []
+        for issue in issues:
+            cacheados = self.cache_adjuntos.obtener(
+                issue["id"], issue.get("updated_on")
             )
+            if cacheados is None:
+                faltan.append(str(issue["id"]))
+            else:
+                ficheros[issue["id"]] = cacheados
 
-            # 1. Llamada inicial para obtener el conteo total (necesario para la paginación)
-            resource_set = self.redmine.issue.filter(
-                project_id=self.project_id, created_on=filtro_fecha, limit=1
-            )
-            len(resource_set)
-            total_count = resource_set.total_count
-            logging.info(
-                f"Total de incidencias encontradas para el mes en curso: {total_count}"
+        if faltan:
+            response = self._consultar_issues(
+                {"issue_id": ",".join(faltan), "status_id": "*"},
+                0,
+                len(faltan),
+                include="attachments",
             )
+            for issue in response.json()["issues"]:
+                pdfs = _ficheros_pdf(issue)
+                self.cache_adjuntos.guardar(issue["id"], issue.get("updated_on"), pdfs)
+                ficheros[issue["id"]] = pdfs
 
-            if total_count == 0:
-                return []
+        return ficheros
 
-            all_issues_data = []
-            # Usar un número razonable de hilos. os.cpu_count() * 5 es un buen punto de partida para I/O.
-            max_workers = min(32, (os.cpu_count() or 1) * 5)
+    def _solicitar_pagina(self, offset, filtros, limit):
+        """
+        Descarga y normaliza una única página de incidencias aplicando los
+        filtros de Redmine recibidos. Las excepciones se propagan.
+        Devuelve (incidencias, total_count del filtro).
 
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # 2. Crear y enviar todas las tareas al pool
-                future_to_offset = {
-                    executor.submit(self._fetch_page, offset, filtro_fecha): offset
-                    for offset in range(0, total_count, limit)
-                }
+        Con la caché de adjuntos activa, la página se pide sin adjuntos y
+        estos se completan desde la caché (ver _ficheros_con_cache).
+        """
+        incluir = {} if self.cache_adjuntos else {"include": "attachments"}
+        response = self._consultar_issues(
+            filtros,
+            offset,
+            limit,
+            # Orden estable: un ticket actualizado durante la extracción no
+            # cambia de página, a diferencia de ordenar por updated_on.
+            sort="id:asc",
+            **incluir,
+        )
+        datos = response.json()
+        issues = datos["issues"]
+        total_count = datos["total_count"]
+        if not self.cache_adjuntos:
+            return [self._normalizar_issue(issue) for issue in issues], total_count
+
+        ficheros = self._ficheros_con_cache(issues)
+        pagina = [
+            self._normalizar_issue(issue, ficheros.get(issue["id"], []))
+            for issue in issues
+        ]
+        return pagina, total_count
 
-                logging.info(
-                    f"Iniciando pool con hasta {max_workers} hilos para la extracción de {len(future_to_offset)} páginas."
+    def _fetch_page(self, offset, filtros, limit=PAGE_SIZE):
+        """
+        Función trabajadora que obtiene una única página de incidencias.
+        En modo adaptativo respeta el límite de concurrencia del controlador
+        AIMD y reintenta la página si Redmine indica saturación.
+        Devuelve (incidencias normalizadas, total_count) o None si la página
+        falló.
+        """
+        intento = 0
+        while True:
+            intento += 1
+            if self.controlador:
+                self.controlador.adquirir()
+            else:
+                self._conexiones.acquire()
+            inicio = time.monotonic()
+            try:
+                resultado = self._solicitar_pagina(offset, filtros, limit)
+                if self.controlador:
+                    self.controlador.liberar(time.monotonic() - inicio)
+                metrics.incrementar("paginas_descargadas")
+                return resultado
+            except Exception as e:
+                saturado = _es_saturacion(e)
+                if self.controlador:
+                    self.controlador.liberar(
+                        time.monotonic() - inicio, saturado=saturado
+                    )
+                if self.controlador and saturado and intento <= REINTENTOS_PAGINA:
+                    espera = 0.5 * 2 ** (intento - 1)
+                    logging.warning(
+                        f"Redmine saturado en el offset {offset} ({e}). "
+                        f"Reintento {intento} en {espera:g} s."
+                    )
+                    metrics.incrementar("reintentos_redmine")
+                    time.sleep(espera)
+                    continue
+                logging.error(
+                    f"Error en el hilo trabajador para el offset {offset} "
+                    f"({filtros.get('created_on')}): {e}",
+                    exc_info=True,
                 )
+                return None
+            finally:
+                if not self.controlador:
+                    self._conexiones.release()
+
+    def _iterar_tramos(self, filtros, tramos, limit, max_workers):
+        """
+        Descarga en paralelo las páginas de los tramos de fechas y las entrega
+        en orden (tramos por fecha y, dentro de cada uno, por offset).
+
+        No hay conteo previo: la primera página de cada tramo trae su
+        total_count. Si un tramo de varios días supera max_incidencias_tramo
+        se divide en dos mitades, para evitar offsets profundos; si no, se
+        piden sus páginas restantes. Nunca hay más de 2 * max_workers páginas
+        en vuelo. Genera tuplas (tramo, offset, pagina); pagina es None si la
+        descarga falló. El total de incidencias queda en self.total_count.
+        """
+        por_entregar = list(tramos)
+        pendientes = deque((tramo, 0) for tramo in tramos)
+        en_vuelo = {}
+        self.total_count = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
 
-                # 3. Recolectar los resultados a medida que se completan
-                for future in as_completed(future_to_offset):
-                    offset = future_to_offset[future]
+            def enviar_pendientes():
+                while pendientes and len(en_vuelo) < max_workers * 2:
+                    tramo, offset = pendientes.popleft()
+                    future = executor.submit(
+                        self._fetch_page,
+                        offset,
+                        dict(filtros, created_on=tramo.filtro),
+                        limit,
+                    )
+                    en_vuelo[future] = (tramo, offset)
+
+            enviar_pendientes()
+            while en_vuelo:
+                completados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for future in completados:
+                    tramo, offset = en_vuelo.pop(future)
                     try:
-                        page_data = future.result()
-                        if page_data:
-                            all_issues_data.extend(page_data)
+                        resultado = future.result()
                     except Exception as exc:
                         logging.error(
-                            f"La página con offset {offset} generó una excepción: {exc}"
+                            f"La página con offset {offset} del tramo "
+                            f"{tramo} generó una excepción: {exc}"
                         )
-            unique_issues = []
-            seen_tickets = set()
-            for issue in all_issues_data:
+                        resultado = None
+                    pagina, total = resultado or (None, None)
+
+                    if offset > 0:
+                        tramo.paginas[offset] = pagina
+                    elif pagina is None:
+                        # Sin la primera página no se conoce el tamaño del
+                        # tramo: se entrega como una única página fallida.
+                        tramo.total = 1
+                        tramo.paginas[0] = None
+                    elif total > self.max_incidencias_tramo and tramo.dias > 1:
+                        mitades = tramo.dividir()
+                        posicion = por_entregar.index(tramo)
+                        por_entregar[posicion : posicion + 1] = mitades
+                        pendientes.extendleft((mitad, 0) for mitad in reversed(mitades))
+                        metrics.incrementar("tramos_divididos")
+                    else:
+                        tramo.total = total
+                        tramo.paginas[0] = pagina
+                        self.total_count += total
+                        pendientes.extend(
+                            (tramo, siguiente)
+                            for siguiente in range(limit, total, limit)
+                        )
+                enviar_pendientes()
+
+                # Entregar lo que ya está completo en orden, empezando por el
+                # tramo más antiguo
+                while por_entregar and por_entregar[0].total is not None:
+                    tramo = por_entregar[0]
+                    while tramo.siguiente in tramo.paginas:
+                        yield tramo, tramo.siguiente, tramo.paginas.pop(tramo.siguiente)
+                        tramo.siguiente += limit
+                    if tramo.siguiente < tramo.total:
+                        break
+                    por_entregar.pop(0)
+
+    def _paginas_sin_repetidos(self, paginas):
+        """
+        Genera las incidencias de cada página, en orden, a medida que llegan,
+        y al terminar comprueba que la extracción esté completa.
+
+        Informa de los solapamientos (un ticket presente en más de una página,
+        p. ej. porque entró una incidencia nueva a mitad de la extracción) y de
+        los huecos (páginas fallidas o tickets que cambiaron de página). Las
+        páginas que no se pudieron descargar ('<tramo>@<offset>') quedan en
+        self.paginas_fallidas.
+        """
+        pagina_de_ticket = {}
+        solapados = []
+        recibidas = 0
+
+        for tramo, offset, page_data in paginas:
+            posicion = f"{tramo}@{offset}"
+            if page_data is None:
+                self.paginas_fallidas.append(posicion)
+                continue
+            unicas = []
+            for issue in page_data:
                 ticket_id = issue.get("Ticket")
-                if ticket_id and ticket_id not in seen_tickets:
-                    unique_issues.append(issue)
-                    seen_tickets.add(ticket_id)
-
-            # Informar si se encontraron y eliminaron duplicados
-            if len(all_issues_data) != len(unique_issues):
-                logging.warning(
-                    f"Se encontraron y eliminaron {len(all_issues_data) - len(unique_issues)} incidencias duplicadas durante la extracción."
-                )
-            logging.info(
-                f"Extracción concurrente completada. Se procesaron {len(all_issues_data)} de {total_count} incidencias."
+                if not ticket_id:
+                    continue
+                if ticket_id in pagina_de_ticket:
+                    solapados.append((ticket_id, pagina_de_ticket[ticket_id], posicion))
+                    continue
+                pagina_de_ticket[ticket_id] = posicion
+                unicas.append(issue)
+            recibidas += len(unicas)
+            if unicas:
+                yield unicas
+
+        if solapados:
+            detalle = ", ".join(
+                f"#{ticket} (páginas {primero} y {repetido})"
+                for ticket, primero, repetido in solapados[:10]
+            )
+            logging.warning(
+                f"Se encontraron {len(solapados)} incidencias repetidas entre páginas: {detalle}"
+            )
+        if self.paginas_fallidas:
+            logging.error(
+                f"No se pudieron descargar {len(self.paginas_fallidas)} páginas: {self.paginas_fallidas}."
+            )
+        total_count = self.total_count
+        faltantes = total_count - recibidas
+        if faltantes > 0:
+            logging.warning(
+                f"Hueco en la extracción: faltan {faltantes} de {total_count} incidencias."
             )
+        elif faltantes < 0:
+            logging.warning(
+                f"Se obtuvieron {-faltantes} incidencias más que el conteo de los tramos ({total_count}); "
+                "se crearon incidencias durante la extracción."
+            )
+
+    def _rango_fechas(self):
+        """
+        Calcula el rango de fechas de creación a extraer según el día de corte.
+        Devuelve (fecha_inicio, fecha_fin) como cadenas 'YYYY-MM-DD'.
+        """
+        today = datetime.now()
+        if today.day <= self.dia_corte:
+            # Si estamos a principio de mes, busca desde el mes anterior.
+            end_date = today
+            start_date = (today - relativedelta(months=1)).replace(day=1)
+        else:
+            # Si no, busca solo en el mes actual.
+            end_date = today
+            start_date = today.replace(day=1)
 
-            return unique_issues
+        logging.info(
+            f"Ejecución día {today.day}. Usando rango de fechas: "
+            f"{start_date:%Y-%m-%d} a {end_date:%Y-%m-%d}"
+        )
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
 
+    def get_redmine_issues_parallel(self, filtros_extra=None):
+        """
+        Extrae las incidencias del mes en curso desde Redmine usando un pool de hilos.
+        'filtros_extra' permite añadir o sobrescribir filtros de Redmine
+        (p. ej. updated_on para una sincronización incremental); un valor
+        None quita el filtro base correspondiente.
+        """
+        try:
+            return [
+                issue
+                for pagina in self.iterar_redmine_issues(filtros_extra)
+                for issue in pagina
+            ]
         except Exception as e:
             logging.error(
                 f"Error al extraer incidencias de Redmine en paralelo: {e}",
                 exc_info=True,
             )
             return None
+
+    def iterar_redmine_issues(self, filtros_extra=None):
+        """
+        Igual que get_redmine_issues_parallel, pero genera las incidencias de
+        cada página (sin repetidos y en orden de offset) en cuanto se
+        descargan, para procesarlas mientras llegan las siguientes.
+        Las excepciones se propagan.
+        """
+        limit = PAGE_SIZE
+        self.paginas_fallidas = []
+        # Formatear fechas y crear el string de filtro para Redmine
+        start_date_str, end_date_str = self._rango_fechas()
+        filtro_fecha = f"><{start_date_str}|{end_date_str}"
+        filtros = {
+            clave: valor
+            for clave, valor in dict(
+                self._filtros_base(filtro_fecha), **(filtros_extra or {})
+            ).items()
+            if valor is not None
+        }
+
+        # 1. Repartir la ventana de fechas en tramos que se descargan a la vez;
+        # cada tramo conoce su tamaño con su primera página, sin conteo previo
+        tramos = planificar_tramos(
+            datetime.strptime(start_date_str, "%Y-%m-%d").date(),
+            datetime.strptime(end_date_str, "%Y-%m-%d").date(),
+            self.dias_tramo,
+        )
+
+        if self.controlador:
+            # El controlador (compartido con los demás proyectos) limita
+            # cuántos de estos hilos piden a la vez
+            max_workers = self.max_conexiones
+        else:
+            # Usar un número razonable de hilos. os.cpu_count() * 5 es un buen punto de partida para I/O.
+            max_workers = min(self.max_conexiones, (os.cpu_count() or 1) * 5)
+
+        logging.info(
+            f"Iniciando pool con hasta {max_workers} hilos para la extracción de {len(tramos)} tramos de fechas."
+        )
+
+        if self.cache_adjuntos:
+            self.cache_adjuntos.reiniciar_contadores()
+
+        # 2. Descargar cada página una sola vez y entregarlas en orden
+        paginas = self._iterar_tramos(filtros, tramos, limit, max_workers)
+        recibidas = 0
+        for pagina in self._paginas_sin_repetidos(paginas):
+            recibidas += len(pagina)
+            yield pagina
+
+        total_count = self.total_count
+        logging.info(
+            f"Extracción concurrente completada. Se procesaron {recibidas} de {total_count} incidencias."
+        )
+        if self.cache_adjuntos:
+            metrics.incrementar("cache_adjuntos_aciertos", self.cache_adjuntos.aciertos)
+            metrics.incrementar("cache_adjuntos_fallos", self.cache_adjuntos.fallos)
+            logging.info(
+                f"Caché de adjuntos: {self.cache_adjuntos.aciertos} aciertos, "
+                f"{self.cache_adjuntos.fallos} fallos (tickets cuyos adjuntos se pidieron a Redmine)."
+            )
+            self.cache_adjuntos.persistir()
+        if self.controlador:
+            logging.info(
+                f"Concurrencia adaptativa: límite final {self.controlador.limite:.1f}, "
+                f"máximo {self.controlador.limite_maximo_alcanzado:.1f}, "
+                f"{self.controlador.reducciones} reducciones por saturación."
+            )
+
+    def get_redmine_issues_incremental(self, store, forzar_completo=False):
+        """
+        Sincroniza el almacén local con Redmine y devuelve las incidencias
+        vigentes del rango en curso.
+
+        Solo se piden a Redmine las incidencias actualizadas desde la última
+        marca de agua (updated_on). Las actualizadas que ya no cumplen los
+        filtros de la extracción (cf_18=PROCEDE o seguir abiertas: sin
+        status_id, Redmine solo devuelve las abiertas) se marcan como baja,
+        igual que en una sincronización completa. Se hace una sincronización
+        completa si se fuerza, si el almacén no tiene marca o si la última
+        completa es demasiado antigua.
+        """
+        try:
+            return [
+                issue
+                for pagina in self.iterar_redmine_issues_incremental(
+                    store, forzar_completo
+                )
+                for issue in pagina
+            ]
+        except Exception as e:
+            logging.error(
+                f"Error en la sincronización incremental con Redmine: {e}",
+                exc_info=True,
+            )
+            return None
+
+    def iterar_redmine_issues_incremental(
+        self, store, forzar_completo=False, tamano_pagina=PAGE_SIZE
+    ):
+        """
+        Igual que get_redmine_issues_incremental, pero genera las incidencias
+        vigentes por páginas en cuanto se conocen, para procesarlas mientras
+        llegan las siguientes: en una sincronización completa, las páginas a
+        medida que se descargan; en una incremental, las del almacén local
+        una vez actualizado, leídas por bloques de 'tamano_pagina'.
+        Las excepciones se propagan.
+        """
+        start_date_str, end_date_str = self._rango_fechas()
+        clave_marca = f"proyecto:{self.project_id}:updated_on"
+        clave_completa = f"proyecto:{self.project_id}:ultima_completa"
+
+        marca = store.obtener_marca(clave_marca)
+        ultima_completa = store.obtener_marca(clave_completa)
+        if ultima_completa and not forzar_completo:
+            antiguedad = datetime.now() - datetime.fromisoformat(ultima_completa)
+            forzar_completo = antiguedad.days >= self.dias_resync_completo
+
+        enviados = set()
+        if forzar_completo or marca is None:
+            logging.info("Sincronización completa con Redmine.")
+            issues = []
+            for pagina in self.iterar_redmine_issues():
+                issues.extend(pagina)
+                enviados.update(issue["Ticket"] for issue in pagina)
+                yield pagina
+            incompleta = bool(self.paginas_fallidas)
+            if incompleta:
+                # Sin la extracción completa no se puede saber qué incidencias
+                # salieron del filtro; se guardan las recibidas y nada más.
+                store.guardar(self.project_id, issues)
+                bajas = 0
+            else:
+                bajas = store.reemplazar(
+                    self.project_id, issues, start_date_str, end_date_str
+                )
+                store.guardar_marca(clave_completa, datetime.now().isoformat())
+        else:
+            logging.info(
+                f"Sincronización incremental: incidencias actualizadas desde {marca}."
+            )
+            filtro_actualizacion = {"updated_on": f">={marca}"}
+            issues = [
+                issue
+                for pagina in self.iterar_redmine_issues(filtro_actualizacion)
+                for issue in pagina
+            ]
+            incompleta = bool(self.paginas_fallidas)
+            # Todas las actualizadas, en cualquier estado y con cualquier
+            # cf_18: las que no aparecen en la consulta anterior salieron
+            # del filtro (p. ej. se cerraron) desde la última sincronización.
+            actualizadas = [
+                issue
+                for pagina in self.iterar_redmine_issues(
+                    dict(filtro_actualizacion, status_id="*", cf_18=None)
+                )
+                for issue in pagina
+            ]
+            incompleta = incompleta or bool(self.paginas_fallidas)
+            store.guardar(self.project_id, issues)
+            vigentes = {issue["Ticket"] for issue in issues}
+            bajas = store.marcar_baja(
+                self.project_id,
+                (
+                    issue["Ticket"]
+                    for issue in actualizadas
+                    if issue["Ticket"] not in vigentes
+                ),
+            )
+
+        if incompleta:
+            # No se avanza la marca de agua: la próxima ejecución volverá a
+            # pedir las incidencias de las páginas que fallaron.
+            logging.warning(
+                "Extracción incompleta; no se actualiza la marca de sincronización."
+            )
+        else:
+            nueva_marca = max(
+                (issue["Actualizado"] for issue in issues if issue.get("Actualizado")),
+                default=marca,
+            )
+            if nueva_marca:
+                store.guardar_marca(clave_marca, nueva_marca)
+
+        logging.info(
+            f"Almacén local actualizado: {len(issues)} incidencias nuevas o modificadas, "
+            f"{bajas} dadas de baja."
+        )
+        # El resto de vigentes del rango sale del almacén (todas, en una
+        # sincronización incremental)
+        for bloque in store.iterar(
+            self.project_id, start_date_str, end_date_str, tamano_pagina
+        ):
+            bloque = [issue for issue in bloque if issue["Ticket"] not in enviados]
+            if bloque:
+                yield bloque
@@ -0,0 +1,406 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Espera máxima entre comprobaciones: el planificador duerme hasta la próxima
+# ejecución, pero en tramos de como mucho una hora para adaptarse a cambios
+# del reloj (horario de verano, suspensión del equipo).
+ESPERA_MAXIMA = 3600
+# Segundos que una tarea cron espera a que termine otra tarea breve (p. ej.
+# el drenado de la cola de correo) antes de dar su ejecución por omitida.
+ESPERA_BLOQUEO = 600
+# Segundos de espera tras un error inesperado del bucle del planificador.
+ESPERA_ERROR = 300
+
+
+def _parsear_campo(texto, minimo, maximo):
+    """
+    Convierte un campo cron ('*', '5', '1-5', '*/15', '1,3,5', '0-30/10')
+    en el conjunto de valores que representa.
+    """
+    valores = set()
+    for parte in texto.split(","):
+        rango, _, paso = parte.partition("/")
+        paso = int(paso) if paso else 1
+        if rango == "*":
+            inicio, fin = minimo, maximo
+        elif "-" in rango:
+            inicio, fin = (int(x) for x in rango.split("-", 1))
+        else:
+            inicio = int(rango)
+            fin = maximo if paso > 1 else inicio
+        if not (minimo <= inicio <= fin <= maximo) or paso < 1:
+            raise ValueError(f"Campo cron fuera de rango: '{parte}'")
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class ExpresionCron:
+    """
+    Expresión cron de cinco campos: minuto hora día-del-mes mes día-de-la-semana
+    (0 o 7 = domingo). Ejemplo: '30 16 * * 1,3,5' = lunes, miércoles y
+    viernes a las 16:30. Como en cron, si se restringen tanto el día del mes
+    como el de la semana basta con que coincida uno de los dos.
+    """
+
+    def __init__(self, texto):
+        campos = texto.split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron '{texto}' debe tener 5 campos.")
+        self.texto = texto
+        self.minutos = sorted(_parsear_campo(campos[0], 0, 59))
+        self.horas = sorted(_parsear_campo(campos[1], 0, 23))
+        self.dias = _parsear_campo(campos[2], 1, 31)
+        self.meses = _parsear_campo(campos[3], 1, 12)
+        self.dias_semana = {d % 7 for d in _parsear_campo(campos[4], 0, 7)}
+        self._dia_libre = campos[2] == "*"
+        self._dia_semana_libre = campos[4] == "*"
+
+    def _coincide_dia(self, fecha):
+        if fecha.month not in self.meses:
+            return False
+        en_dia = fecha.day in self.dias
+        en_semana = (fecha.weekday() + 1) % 7 in self.dias_semana
+        if self._dia_libre or self._dia_semana_libre:
+            return en_dia and en_semana
+        return en_dia or en_semana
+
+    def _horas_del_dia(self, fecha):
+        return [
+            datetime(fecha.year, fecha.month, fecha.day, hora, minuto)
+            for hora in self.horas
+            for minuto in self.minutos
+        ]
+
+    def siguiente(self, desde):
+        """
+        Devuelve la primera ejecución estrictamente posterior a 'desde'.
+        """
+        for dias in range(366 * 5):
+            fecha = (desde + timedelta(days=dias)).date()
+            if self._coincide_dia(fecha):
+                for momento in self._horas_del_dia(fecha):
+                    if momento > desde:
+                        return momento
+        raise ValueError(f"La expresión cron '{self.texto}' nunca se cumple.")
+
+    def anterior(self, hasta):
+        """
+        Devuelve la última ejecución programada anterior o igual a 'hasta'
+        (None si no hubo ninguna en el último año).
+        """
+        for dias in range(367):
+            fecha = (hasta - timedelta(days=dias)).date()
+            if self._coincide_dia(fecha):
+                for momento in reversed(self._horas_del_dia(fecha)):
+                    if momento <= hasta:
+                        return momento
+        return None
+
+
+class BloqueoEjecucion:
+    """
+    Bloqueo exclusivo sobre un archivo: impide que dos
+    ejecuciones coincidan, tanto entre hilos del mismo proceso como entre
+    procesos del mismo equipo. El sistema operativo lo libera si el proceso muere.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._hilos = threading.Lock()
+        self._archivo = None
+        carpeta = os.path.dirname(ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+
+    def adquirir(self, espera=0):
+        """
+        Devuelve True si se obtuvo el bloqueo y False si sigue tomado después
+        de reintentar durante 'espera' segundos.
+        """
+        limite = time.monotonic() + espera
+        while not self._intentar():
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(1)
+        return True
+
+    def _intentar(self):
+        if not self._hilos.acquire(blocking=False):
+            return False
+        archivo = open(self.ruta, "a+")
+        try:
+            archivo.seek(0)
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            archivo.close()
+            self._hilos.release()
+            return False
+        archivo.truncate()
+        archivo.write(str(os.getpid()))
+        archivo.flush()
+        self._archivo = archivo
+        return True
+
+    def liberar(self):
+        archivo, self._archivo = self._archivo, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            archivo.close()
+            self._hilos.release()
+
+
+class EstadoPlanificador:
+    """
+    Última ejecución de cada tarea, guardada en JSON para sobrevivir a
+    reinicios: {tarea: {"programada", "inicio", "fin", "estado", "en_curso"}}.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._datos = {}
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, "r", encoding="utf-8") as f:
+                    self._datos = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(
+                    f"No se pudo leer el estado del planificador '{ruta}': {e}."
+                )
+
+    def obtener(self, tarea):
+        with self._lock:
+            return dict(self._datos.get(tarea, {}))
+
+    def registrar_inicio(self, tarea, programada):
+        self._actualizar(
+            tarea,
+            programada=programada.isoformat(timespec="seconds"),
+            inicio=datetime.now().isoformat(timespec="seconds"),
+            fin=None,
+            estado=None,
+            en_curso=True,
+        )
+
+    def registrar_fin(self, tarea, estado):
+        self._actualizar(
+            tarea,
+            fin=datetime.now().isoformat(timespec="seconds"),
+            estado=estado,
+            en_curso=False,
+        )
+
+    def _actualizar(self, tarea, **valores):
+        with self._lock:
+            self._datos.setdefault(tarea, {}).update(valores)
+            carpeta = os.path.dirname(self.ruta)
+            if carpeta and not os.path.exists(carpeta):
+                os.makedirs(carpeta)
+            temporal = self.ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._datos, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+
+
+class _Tarea:
+    def __init__(self, nombre, funcion, siguiente, cron=None, recuperacion="ninguna"):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.siguiente = siguiente
+        self.cron = cron
+        self.recuperacion = recuperacion
+        self.proxima = siguiente(datetime.now())
+        self.hilo = None
+
+
+class Planificador:
+    """
+    Ejecuta tareas según una expresión cron o cada cierto intervalo.
+
+    Duerme hasta la próxima ejecución en lugar de consultar cada minuto.
+    Cada tarea corre en su propio hilo y todas comparten un bloqueo de
+    archivo, de modo que nunca se solapan (ni con otra instancia en el mismo
+    equipo): si al llegar su hora hay otra en curso, esa ejecución se omite.
+    Así, mientras corre main_job no se drena la cola de correo (main_job la
+    drena al enviar), y dos drenados nunca envían a la vez la misma entrega.
+    Las tareas cron guardan su última ejecución y, al arrancar, recuperan
+    la ejecución perdida si el equipo estaba apagado o el proceso se cayó a mitad.
+    """
+
+    def __init__(self, ruta_estado, ruta_bloqueo):
+        self.estado = EstadoPlanificador(ruta_estado)
+        self.bloqueo = BloqueoEjecucion(ruta_bloqueo)
+        self.tareas = []
+        self._parar = threading.Event()
+
+    def agregar_cron(self, nombre, expresion, funcion, recuperacion="una"):
+        """
+        'recuperacion': 'una' ejecuta una vez al arrancar si se perdió alguna
+        ejecución programada; 'ninguna' espera a la siguiente.
+        """
+        cron = ExpresionCron(expresion)
+        self.tareas.append(_Tarea(nombre, funcion, cron.siguiente, cron, recuperacion))
+        logging.info(
+            f"Tarea '{nombre}' programada con '{expresion}'. "
+            f"Próxima ejecución: {self.tareas[-1].proxima:%Y-%m-%d %H:%M}."
+        )
+
+    def agregar_intervalo(self, nombre, minutos, funcion):
+        self.tareas.append(
+            _Tarea(nombre, funcion, lambda desde: desde + timedelta(minutes=minutos))
+        )
+
+    def ejecucion_pendiente(self, tarea, max_retraso=None):
+        """
+        Devuelve la ejecución programada que se perdió (o quedó interrumpida)
+        y debe recuperarse al arrancar, o None.
+        """
+        if tarea.cron is None or tarea.recuperacion != "una":
+            return None
+        registro = self.estado.obtener(tarea.nombre)
+        if not registro:
+            return None
+        ahora = datetime.now()
+
+        def a_tiempo(perdida):
+            if max_retraso is not None and ahora - perdida > max_retraso:
+                logging.warning(
+                    f"La ejecución de '{tarea.nombre}' del {perdida:%Y-%m-%d %H:%M} "
+                    "es demasiado antigua. No se recuperará."
+                )
+                return False
+            return True
+
+        if registro.get("en_curso"):
+            logging.warning(
+                f"La ejecución de '{tarea.nombre}' iniciada el {registro['inicio']} "
+                "quedó interrumpida."
+            )
+            perdida = datetime.fromisoformat(registro["programada"])
+            if a_tiempo(perdida):
+                return perdida
+            # Se da por cerrada para no volver a avisar en cada arranque; aún
+            # puede haber una ejecución posterior perdida que recuperar
+            self.estado.registrar_fin(tarea.nombre, "interrumpida")
+
+        perdida = tarea.cron.anterior(ahora)
+        if perdida is None or perdida <= datetime.fromisoformat(registro["programada"]):
+            return None
+        return perdida if a_tiempo(perdida) else None
+
+    def lanzar(self, tarea, programada=None):
+        """
+        Ejecuta la tarea en segundo plano, salvo que la anterior siga en curso.
+        """
+        if tarea.hilo is not None and tarea.hilo.is_alive():
+            logging.warning(
+                f"La ejecución anterior de '{tarea.nombre}' sigue en curso. Se omitirá esta."
+            )
+            return
+        tarea.hilo = threading.Thread(
+            target=self._ejecutar,
+            args=(tarea, programada or datetime.now()),
+            name=f"tarea-{tarea.nombre}",
+            daemon=True,
+        )
+        tarea.hilo.start()
+
+    def _ejecutar(self, tarea, programada):
+        espera = ESPERA_BLOQUEO if tarea.cron is not None else 0
+        if not self.bloqueo.adquirir(espera):
+            if tarea.cron is None:
+                # Habitual en las tareas por intervalo: se reintenta en el siguiente
+                logging.info(
+                    f"Hay otra ejecución en curso (bloqueo '{self.bloqueo.ruta}'). "
+                    f"'{tarea.nombre}' se omite hasta su siguiente intervalo."
+                )
+            else:
+                logging.warning(
+                    f"Hay otra ejecución en curso (bloqueo '{self.bloqueo.ruta}'). "
+                    f"Se omitirá '{tarea.nombre}'."
+                )
+            return
+        estado = "error"
+        try:
+            if tarea.cron is not None:
+                self.estado.registrar_inicio(tarea.nombre, programada)
+            resultado = tarea.funcion()
+            estado = resultado if isinstance(resultado, str) else "exito"
+        except Exception as e:
+            logging.error(f"Error en la tarea '{tarea.nombre}': {e}", exc_info=True)
+        finally:
+            if tarea.cron is not None:
+                self.estado.registrar_fin(tarea.nombre, estado)
+            self.bloqueo.liberar()
+
+    def iniciar(self, ejecutar_al_iniciar=False, max_retraso=None):
+        """
+        Bucle principal: bloquea hasta que se llame a detener().
+        Con 'ejecutar_al_iniciar' las tareas cron se ejecutan una vez al
+        arrancar; en otro caso solo si tienen una ejecución que recuperar.
+        """
+        for tarea in self.tareas:
+            if tarea.cron is None:
+                continue
+            try:
+                perdida = self.ejecucion_pendiente(tarea, max_retraso)
+                if perdida is not None:
+                    logging.info(
+                        f"Recuperando la ejecución de '{tarea.nombre}' programada "
+                        f"para el {perdida:%Y-%m-%d %H:%M}."
+                    )
+                if perdida is not None or ejecutar_al_iniciar:
+                    self.lanzar(tarea, perdida)
+            except Exception as e:
+                logging.error(
+                    f"Error al arrancar la tarea '{tarea.nombre}': {e}", exc_info=True
+                )
+
+        while not self._parar.is_set():
+            try:
+                ahora = datetime.now()
+                proxima = min(tarea.proxima for tarea in self.tareas)
+                espera = (proxima - ahora).total_seconds()
+                if espera > 0:
+                    self._parar.wait(min(espera, ESPERA_MAXIMA))
+                    continue
+                for tarea in self.tareas:
+                    if tarea.proxima <= ahora:
+                        self.lanzar(tarea, tarea.proxima)
+                        tarea.proxima = tarea.siguiente(ahora)
+            except Exception as e:
+                # Un fallo del planificador no detiene el servicio
+                logging.error(
+                    f"Error en el bucle del planificador: {e}. "
+                    f"Se reintentará en {ESPERA_ERROR // 60} minutos.",
+                    exc_info=True,
+                )
+                self._parar.wait(ESPERA_ERROR)
+
+    def detener(self, espera=None):
+        """
+        Detiene el bucle y espera (como mucho 'espera' segundos por tarea) a
+        que terminen las tareas en curso.
+        """
+        self._parar.set()
+        for tarea in self.tareas:
+            if tarea.hilo is not None:
+                tarea.hilo.join(espera)
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import re
+
+import pandas as pd
+
+try:
+    # Opcional: formato columnar Parquet (mucho más rápido que Excel o CSV)
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+PREFIJO = "incidencias_"
+EXTENSIONES = {"parquet": ".parquet", "csv": ".csv.gz"}
+_PATRON = re.compile(r"^incidencias_(?P<run_id>.+?)(?P<ext>\.parquet|\.csv\.gz)$")
+
+
+def _formato_efectivo(formato):
+    if formato == "parquet" and pyarrow is None:
+        logging.warning(
+            "pyarrow no está instalado. La instantánea se guardará como CSV comprimido."
+        )
+        return "csv"
+    if formato == "auto":
+        return "parquet" if pyarrow is not None else "csv"
+    return formato
+
+
+def guardar_snapshot(df, carpeta, run_id, formato="auto", conservar=10):
+    """
+    Guarda la extracción cruda de Redmine como 'incidencias_<run_id>' en
+    Parquet o, si no hay pyarrow o se pide 'csv', en CSV comprimido con gzip.
+    Después borra las instantáneas más antiguas para conservar solo las
+    'conservar' más recientes. Devuelve la ruta del archivo escrito.
+    """
+    formato = _formato_efectivo(formato)
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de instantánea no soportado: '{formato}'")
+    if not os.path.exists(carpeta):
+        os.makedirs(carpeta)
+
+    ruta = os.path.join(carpeta, f"{PREFIJO}{run_id}{EXTENSIONES[formato]}")
+    temporal = ruta + ".tmp"
+    if formato == "parquet":
+        df.to_parquet(temporal, index=False)
+    else:
+        # CSV no admite listas: los ficheros de cada ticket se guardan como JSON
+        df.assign(
+            Ficheros=df["Ficheros"].map(lambda f: json.dumps(f, ensure_ascii=False))
+        ).to_csv(temporal, index=False, compression="gzip")
+    os.replace(temporal, ruta)
+    logging.info(f"Instantánea de {len(df)} incidencias guardada en '{ruta}'.")
+
+    depurar_snapshots(carpeta, conservar)
+    return ruta
+
+
+def listar_snapshots(carpeta):
+    """
+    Devuelve las rutas de las instantáneas de la carpeta, de la más antigua
+    a la más reciente (los run_id se ordenan cronológicamente).
+    """
+    if not os.path.isdir(carpeta):
+        return []
+    nombres = [
+        (coincidencia.group("run_id"), nombre)
+        for nombre in os.listdir(carpeta)
+        if (coincidencia := _PATRON.match(nombre))
+    ]
+    return [os.path.join(carpeta, nombre) for _, nombre in sorted(nombres)]
+
+
+def ultimo_snapshot(carpeta):
+    """
+    Devuelve la ruta de la instantánea más reciente o None si no hay ninguna.
+    """
+    snapshots = listar_snapshots(carpeta)
+    return snapshots[-1] if snapshots else None
+
+
+def cargar_snapshot(ruta):
+    """
+    Lee una instantánea y devuelve un DataFrame con las mismas columnas que
+    la extracción original, listo para process_incidents.
+    """
+    if ruta.endswith(EXTENSIONES["parquet"]):
+        df = pd.read_parquet(ruta)
+        # pyarrow devuelve arrays de numpy; el resto del proceso espera listas
+        df["Ficheros"] = df["Ficheros"].map(list)
+    else:
+        df = pd.read_csv(
+            ruta,
+            compression="gzip",
+            dtype=str,
+            keep_default_na=False,
+            na_values=[""],
+        )
+        df["Ticket"] = df["Ticket"].astype("int64")
+        df["Ficheros"] = df["Ficheros"].map(json.loads)
+    logging.info(f"Se cargaron {len(df)} incidencias de la instantánea '{ruta}'.")
+    return df
+
+
+def depurar_snapshots(carpeta, conservar):
+    """
+    Borra las instantáneas más antiguas dejando solo las 'conservar' más recientes.
+    """
+    antiguas = listar_snapshots(carpeta)[:-conservar] if conservar > 0 else []
+    for ruta in antiguas:
+        try:
+            os.remove(ruta)
+            logging.info(f"Instantánea antigua eliminada: {os.path.basename(ruta)}")
+        except OSError as e:
+            logging.error(f"No se pudo eliminar la instantánea '{ruta}': {e}")